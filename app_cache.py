@@ -0,0 +1,91 @@
+"""Streamlit caches and background report jobs for main.py.
+
+Pay results are already memoized process-wide by utils.PAY_CACHE, so only
+what is built from them is cached here. st.cache_data keys the comparison
+tables on both pay results; rendered reports run on report_jobs.REPORT_JOBS,
+keyed on every input they depend on, so a report is rebuilt only when one of
+those inputs changes, and sessions asking for the same one share it.
+"""
+import hashlib
+import json
+
+import pandas as pd
+import streamlit as st
+
+from report_generators import generate_excel_report, generate_pdf_report
+from report_jobs import REPORT_JOBS
+from utils import diff_pay
+
+COMPARISON_CACHE_ENTRIES = 256
+COMPARISON_CACHE_TTL = 60 * 60
+
+# Pay components shown in the monthly comparison, as (label, MonthlyPay field)
+COMPARISON_COMPONENTS = [
+    ("Base Pay", 'base_pay'),
+    ("BAH", 'bah'),
+    ("BAS", 'bas'),
+    ("Per Diem", 'per_diem'),
+    ("Min Income Adj", 'minimum_income_adjustment'),
+    ("Hazard Pay", 'hazard_pay'),
+    ("Hardship Pay", 'hardship_pay'),
+    ("Danger Pay", 'danger_pay'),
+    ("Special Pay", 'special_pay'),
+    ("Allowances", 'allowances'),
+]
+
+# Report generator and the METRICS stage it records, per report format
+REPORT_GENERATORS = {
+    'pdf': (generate_pdf_report, 'report.pdf'),
+    'xlsx': (generate_excel_report, 'report.excel'),
+}
+
+def build_correction_report(kind, original_pay, correct_pay, service_category, grade, years, start_date,
+                            end_date, dependents, hazardous_duty, hardship_duty, at_border, sm_name, sm_dodid,
+                            sm_task_force, sm_company, original_details):
+    """Build a correction report ('pdf' or 'xlsx') as bytes"""
+    generate = REPORT_GENERATORS[kind][0]
+    return generate(
+        original_pay, service_category, grade, years, start_date, end_date, dependents,
+        hazardous_duty, hardship_duty, at_border, sm_name, sm_dodid, sm_task_force, sm_company,
+        is_correction=True, correct_pay=correct_pay, original_details=original_details
+    )
+
+def submit_correction_report(kind, *args, original_details, owner=None, profile=None):
+    """Queue build_correction_report on REPORT_JOBS and return the job id.
+
+    The job key is a digest of every argument, so the same inputs reuse the
+    queued or finished job instead of building the report again. `profile`
+    profiles this job for `owner` only (see REPORT_JOBS.submit).
+    """
+    inputs = json.dumps([kind, args, original_details], sort_keys=True, default=str)
+    key = hashlib.sha256(inputs.encode('utf-8')).hexdigest()
+    return REPORT_JOBS.submit(build_correction_report, kind, *args, original_details=original_details,
+                              key=key, owner=owner, stage=REPORT_GENERATORS[kind][1], profile=profile)
+
+@st.cache_data(max_entries=COMPARISON_CACHE_ENTRIES, ttl=COMPARISON_CACHE_TTL, show_spinner=False)
+def monthly_comparison(original_pay, correct_pay):
+    """Original vs. correct pay as two tables: one row per month, and one row per month and component.
+
+    Components that are zero on both sides of a month are left out of the
+    breakdown, the same way the old per-month view skipped them.
+    """
+    months = diff_pay(original_pay, correct_pay).months
+    summary = pd.DataFrame({
+        'Month': [month.key for month in months],
+        'Original Days': [month.original.days for month in months],
+        'Correct Days': [month.correct.days for month in months],
+        'Original': [month.original.total for month in months],
+        'Correct': [month.correct.total for month in months],
+        'Difference': [round(month.total, 2) for month in months],
+    })
+    breakdown = pd.DataFrame(
+        [
+            (month.key, label, getattr(month.original, field), getattr(month.correct, field),
+             round(month.delta(field), 2))
+            for month in months
+            for label, field in COMPARISON_COMPONENTS
+            if field == 'base_pay' or getattr(month.original, field) or getattr(month.correct, field)
+        ],
+        columns=['Month', 'Component', 'Original', 'Correct', 'Difference'],
+    )
+    return summary, breakdown
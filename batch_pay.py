@@ -0,0 +1,308 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import METRICS
+from utils import (
+    rate_table_periods, format_month_key, coerce_service_category, missing_inputs_message, DEFAULT_GRADE,
+    ServiceCategory
+)
+
+# Optional roster columns and the value used when a column is missing
+MEMBER_DEFAULTS = {
+    'has_dependents': False,
+    'hazardous_duty': False,
+    'hardship_duty': False,
+    'at_border': False,
+    'present_this_month': False,
+}
+
+# Pay components of every monthly row, in output order
+BREAKDOWN_COLUMNS = [
+    'days', 'base_pay', 'bah', 'bas', 'per_diem', 'minimum_income_adjustment',
+    'hazard_pay', 'hardship_pay', 'danger_pay', 'special_pay', 'allowances', 'total'
+]
+
+def _to_days(values):
+    """Convert a column of dates to datetime64[D]"""
+    return pd.to_datetime(values).values.astype('datetime64[D]')
+
+def _member_rates(rate_table, grades, years, dependents):
+    """Look up daily base pay, BAH and BAS for every member in one pass over the rate table"""
+    width = rate_table.max_years + 1
+    base_table = np.frombuffer(rate_table.base_pay, dtype=np.float64).reshape(-1, width)
+    bah_table = np.frombuffer(rate_table.bah, dtype=np.float64).reshape(-1, 2)
+
+    # Texas SG rows usually leave grade and years blank (roster_errors rejects
+    # blank ones on NG rows); they and unknown grades resolve to the default
+    # grade and 0 years instead of a bad index
+    grades = grades.fillna(DEFAULT_GRADE)
+    default_index = rate_table.grade_index[DEFAULT_GRADE]
+    grade_idx = grades.map(rate_table.grade_index).fillna(default_index).to_numpy(dtype=np.intp)
+    years = np.nan_to_num(years.to_numpy(dtype=np.float64), nan=0.0)
+    year_idx = np.clip(np.trunc(years), 0, rate_table.max_years).astype(np.intp)
+
+    base = base_table[grade_idx, year_idx]
+    bah = np.round(bah_table[grade_idx, dependents.astype(np.intp)], 2)
+    # BAS depends only on the grade, so resolve it once per distinct grade
+    bas_by_grade = {grade: rate_table.bas_rate(grade) for grade in grades.unique()}
+    bas = np.round(grades.map(bas_by_grade).to_numpy(dtype=np.float64), 2)
+    return base, bah, bas
+
+def _month_labels(months):
+    """Build '%B %Y' keys for an array of datetime64[M] values, formatting each distinct month once"""
+    unique, inverse = np.unique(months, return_inverse=True)
+    labels = np.array([
+        format_month_key(int(m) // 12 + 1970, int(m) % 12 + 1) for m in unique.astype(np.int64)
+    ], dtype=object)
+    return labels[inverse]
+
+def _category_or_error(value):
+    try:
+        return coerce_service_category(value)
+    except ValueError as e:
+        return e
+
+def roster_errors(members):
+    """Why each roster row cannot be priced, as a Series aligned with members (NaN for rows that can).
+
+    The messages match the ValueError calculate_total_pay raises for the same member.
+    """
+    categories = members['service_category'].map(_category_or_error)
+    bad_category = categories.map(lambda category: isinstance(category, ValueError)).to_numpy(dtype=bool)
+    ng = ~bad_category & (categories != ServiceCategory.TEXAS_SG).to_numpy()
+    grades = members['grade']
+    blank = {
+        'grade': ng & (grades.isna() | (grades == '')).to_numpy(),
+        'years_of_service': ng & members['years_of_service'].isna().to_numpy(),
+        'start_date': ~bad_category & members['start_date'].isna().to_numpy(),
+        'end_date': ~bad_category & members['end_date'].isna().to_numpy(),
+    }
+
+    errors = np.full(len(members), None, dtype=object)
+    for position in np.flatnonzero(bad_category | np.logical_or.reduce(list(blank.values()))):
+        if bad_category[position]:
+            errors[position] = str(categories.iloc[position])
+        else:
+            errors[position] = missing_inputs_message([name for name, mask in blank.items() if mask[position]])
+    return pd.Series(errors, index=members.index)
+
+@METRICS.timed('batch.calculate')
+def calculate_total_pay_batch(members):
+    """Calculate monthly pay for a whole roster in one vectorized pass.
+
+    `members` is a DataFrame with one row per service member and the columns
+    service_category, grade, years_of_service, start_date and end_date, plus
+    the optional flag columns in MEMBER_DEFAULTS. Returns a long-format
+    DataFrame with one row per member per month, matching the values
+    calculate_total_pay puts in each monthly_breakdown entry, plus the
+    member's daily rates (NaN where Texas SG has no such rate). Raises
+    ValueError if any row fails roster_errors.
+    """
+    errors = roster_errors(members).dropna()
+    if len(errors):
+        listed = '; '.join(f"row {member}: {error}" for member, error in errors.head(5).items())
+        more = f" (and {len(errors) - 5} more)" if len(errors) > 5 else ''
+        raise ValueError(f"Roster rows cannot be priced: {listed}{more}")
+    METRICS.count('batch.members', len(members))
+    members = members.copy()
+    for column, default in MEMBER_DEFAULTS.items():
+        if column not in members:
+            members[column] = default
+        members[column] = members[column].fillna(default).astype(bool)
+
+    categories = members['service_category'].map(coerce_service_category)
+    is_texas = (categories == ServiceCategory.TEXAS_SG).to_numpy()
+    grades = members['grade'].astype(str)
+
+    start = _to_days(members['start_date'])
+    end = _to_days(members['end_date'])
+
+    # Monthly incentives (full amount if present any day in the month)
+    present = members['present_this_month'].to_numpy()
+    hazard = np.where(members['hazardous_duty'].to_numpy() & present, 1000.0, 0.0)
+    hardship = np.where(members['hardship_duty'].to_numpy() & present, 500.0, 0.0)
+    danger = np.where(members['at_border'].to_numpy() & present, 225.0, 0.0)
+
+    # Expand every member into the months their order touches
+    first_month = start.astype('datetime64[M]')
+    last_month = end.astype('datetime64[M]')
+    month_counts = np.where(end < start, 0, (last_month - first_month).astype(np.int64) + 1)
+    row = np.repeat(np.arange(len(members)), month_counts)
+    offset = np.arange(len(row)) - np.repeat(np.cumsum(month_counts) - month_counts, month_counts)
+    months = first_month[row] + offset.astype('timedelta64[M]')
+
+    month_start = months.astype('datetime64[D]')
+    month_end = (months + np.timedelta64(1, 'M')).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    row_first = np.maximum(start[row], month_start)
+    row_last = np.minimum(end[row], month_end)
+    days = (row_last - row_first).astype(np.int64) + 1
+
+    texas = is_texas[row]
+    ng = ~texas
+
+    # Daily amounts are paid from the pay table in force on each day, so every
+    # month row adds up its days under each table version in the roster's range
+    if len(row):
+        periods = rate_table_periods(row_first.min().item(), row_last.max().item())
+    else:
+        periods = rate_table_periods(date.today(), date.today())
+    base_pay, ng_bah, ng_bas, per_diem, ng_adjustment, special_pay, allowances, daily_total_pay = (
+        np.zeros(len(row)) for _ in range(8)
+    )
+    daily_base_rate, daily_bah_rate, daily_bas_rate, daily_adjustment_rate = (
+        np.zeros(len(row)) for _ in range(4)
+    )
+    for first_day, last_day, rate_table in periods:
+        first_day, last_day = np.datetime64(first_day, 'D'), np.datetime64(last_day, 'D')
+        period_days = np.maximum(
+            (np.minimum(row_last, last_day) - np.maximum(row_first, first_day)).astype(np.int64) + 1, 0
+        )
+        texas_sg_rates = rate_table.texas_sg
+        base, bah, bas = _member_rates(rate_table, grades, members['years_of_service'],
+                                       members['has_dependents'].to_numpy())
+        daily_total = base + bah + bas + rate_table.per_diem
+        adjustment = np.where(daily_total < rate_table.minimum_daily_rate,
+                              rate_table.minimum_daily_rate - daily_total, 0.0)
+
+        base_rate = np.where(texas, texas_sg_rates['daily_base_rate'], base[row])
+        base_pay += base_rate * period_days
+        ng_bah += np.where(ng, bah[row] * period_days, 0.0)
+        ng_bas += np.where(ng, bas[row] * period_days, 0.0)
+        per_diem += np.where(ng, rate_table.per_diem * period_days, 0.0)
+        ng_adjustment += np.where(ng, adjustment[row] * period_days, 0.0)
+        special_pay += np.where(texas, texas_sg_rates['special_pay'] * period_days, 0.0)
+        allowances += np.where(texas, texas_sg_rates['daily_allowance'] * period_days, 0.0)
+        daily_total_pay += np.where(texas, texas_sg_rates['total_daily_rate'] * period_days, 0.0)
+
+        # Reported daily rates are the ones in force on the row's last day
+        in_force = row_last >= first_day
+        daily_base_rate = np.where(in_force, base_rate, daily_base_rate)
+        daily_bah_rate = np.where(in_force, bah[row], daily_bah_rate)
+        daily_bas_rate = np.where(in_force, bas[row], daily_bas_rate)
+        daily_adjustment_rate = np.where(in_force, adjustment[row], daily_adjustment_rate)
+
+    hazard_pay = np.where(ng, hazard[row], 0.0)
+    hardship_pay = np.where(ng, hardship[row], 0.0)
+    danger_pay = np.where(ng, danger[row], 0.0)
+    total = np.where(
+        texas,
+        daily_total_pay,
+        base_pay + ng_bah + ng_bas + per_diem + ng_adjustment + hazard_pay + hardship_pay + danger_pay
+    )
+
+    month_numbers = months.astype(np.int64)
+    result = pd.DataFrame({
+        'member': members.index.to_numpy()[row],
+        'service_category': categories.map(lambda c: c.value).to_numpy()[row],
+        'grade': grades.to_numpy()[row],
+        'year': month_numbers // 12 + 1970,
+        'month': month_numbers % 12 + 1,
+        'month_key': _month_labels(months),
+        'daily_base_rate': daily_base_rate,
+        'daily_bah_rate': np.where(texas, np.nan, daily_bah_rate),
+        'daily_bas_rate': np.where(texas, np.nan, daily_bas_rate),
+        'daily_adjustment_rate': np.where(texas, np.nan, daily_adjustment_rate),
+        'days': days,
+        'base_pay': base_pay,
+        'bah': ng_bah,
+        'bas': ng_bas,
+        'per_diem': per_diem,
+        'minimum_income_adjustment': ng_adjustment,
+        'hazard_pay': hazard_pay,
+        'hardship_pay': hardship_pay,
+        'danger_pay': danger_pay,
+        'special_pay': special_pay,
+        'allowances': allowances,
+        'total': total,
+    })
+    money = BREAKDOWN_COLUMNS[1:]
+    result[money] = result[money].round(2)
+    return result
+
+def batch_grand_totals(breakdown):
+    """Summarize a calculate_total_pay_batch result into total days and grand total per member"""
+    totals = breakdown.groupby('member', sort=False).agg(
+        total_days=('days', 'sum'),
+        grand_total=('total', 'sum'),
+    )
+    totals['grand_total'] = totals['grand_total'].round(2)
+    return totals
+
+# Columns that identify one member-month in a batch breakdown
+MONTH_KEYS = ['member', 'year', 'month']
+
+def diff_pay_batches(original, correct):
+    """Compare two calculate_total_pay_batch results (original vs. correct) month by month.
+
+    Members are matched on the `member` column, so both rosters must use the
+    same index. Returns one row per member per month touched by either
+    result, with the original and correct totals and a `<component>_delta`
+    column (correct minus original) for every pay component; a month missing
+    on one side counts as zero there.
+    """
+    columns = MONTH_KEYS + ['month_key'] + BREAKDOWN_COLUMNS
+    merged = original[columns].merge(
+        correct[columns], on=MONTH_KEYS, how='outer', suffixes=('_original', '_correct'), sort=True
+    )
+
+    diff = merged[MONTH_KEYS].copy()
+    diff['month_key'] = merged['month_key_original'].fillna(merged['month_key_correct'])
+    original_values = merged[[f'{column}_original' for column in BREAKDOWN_COLUMNS]].fillna(0).to_numpy()
+    correct_values = merged[[f'{column}_correct' for column in BREAKDOWN_COLUMNS]].fillna(0).to_numpy()
+    deltas = np.round(correct_values - original_values, 2)
+
+    diff['original_total'] = original_values[:, -1]
+    diff['correct_total'] = correct_values[:, -1]
+    for i, column in enumerate(BREAKDOWN_COLUMNS):
+        diff[f'{column}_delta'] = deltas[:, i]
+    diff['days_delta'] = diff['days_delta'].astype(np.int64)
+    return diff
+
+def batch_diff_totals(diff):
+    """Summarize a diff_pay_batches result per member.
+
+    `difference` is the net correct-minus-original amount; `underpayment` and
+    `overpayment` split it into the months that were paid too little and too
+    much, both as positive amounts.
+    """
+    total_delta = diff['total_delta']
+    totals = diff.assign(
+        underpayment=total_delta.where(total_delta > 0, 0.0),
+        overpayment=-total_delta.where(total_delta < 0, 0.0),
+    ).groupby('member', sort=False).agg(
+        original_total=('original_total', 'sum'),
+        correct_total=('correct_total', 'sum'),
+        difference=('total_delta', 'sum'),
+        underpayment=('underpayment', 'sum'),
+        overpayment=('overpayment', 'sum'),
+    )
+    return totals.round(2)
+
+_TRUE_STRINGS = {'true', 't', 'yes', 'y', '1', 'x'}
+
+def _parse_flag(value):
+    """Read a yes/no roster cell the way a clerk would type it"""
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_STRINGS
+    return bool(value) if pd.notna(value) else False
+
+def read_roster(path):
+    """Load a roster from a CSV, Excel or Parquet file with dates and flags parsed"""
+    suffix = str(path).lower().rsplit('.', 1)[-1]
+    if suffix == 'csv':
+        members = pd.read_csv(path)
+    elif suffix in ('xlsx', 'xls'):
+        members = pd.read_excel(path)
+    elif suffix == 'parquet':
+        members = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported roster format: {path}")
+
+    for column in ('start_date', 'end_date'):
+        members[column] = pd.to_datetime(members[column]).dt.date
+    for column in MEMBER_DEFAULTS:
+        if column in members:
+            members[column] = members[column].map(_parse_flag)
+    return members
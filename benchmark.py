@@ -0,0 +1,228 @@
+"""Benchmarks for the pay engine, batch mode and report generation.
+
+Every run saves its timings as JSON so later runs can be compared against it.
+
+Usage:
+    python benchmark.py                                  # run everything, save to benchmark_results/
+    python benchmark.py -k pay. -k rates.                # only cases whose name contains a filter
+    python benchmark.py --quick                          # skip the 100k-member roster
+    python benchmark.py --compare benchmark_results/baseline.json --threshold 0.10
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+from utils import ServiceCategory, calculate_total_pay, clear_pay_cache, get_available_grades, get_base_pay_rate
+
+RESULTS_DIR = 'benchmark_results'
+ROSTER_SIZES = (1, 100, 10_000, 100_000)
+REPORT_MONTHS = (1, 12, 36)
+ORDER_START = date(2024, 1, 1)
+
+def _order(months):
+    """Start and end dates of an order spanning the given number of calendar months"""
+    year, month = divmod(ORDER_START.month - 1 + months, 12)
+    return ORDER_START, date(ORDER_START.year + year, month + 1, 1) - timedelta(days=1)
+
+def _ng_pay(months, cached=False):
+    start, end = _order(months)
+
+    def run():
+        if not cached:
+            clear_pay_cache()
+        calculate_total_pay(ServiceCategory.ARMY_NG, 'E-5', 6, start, end, True, True, True, True, True)
+    return run
+
+def _texas_pay(months, cached=False):
+    start, end = _order(months)
+
+    def run():
+        if not cached:
+            clear_pay_cache()
+        calculate_total_pay(ServiceCategory.TEXAS_SG, None, 0, start, end)
+    return run
+
+def _rate_lookups():
+    grades = get_available_grades()
+
+    def run():
+        for grade in grades:
+            for years in range(0, 41, 4):
+                get_base_pay_rate(grade, years)
+    return run
+
+def make_roster(size, seed=0):
+    """Synthetic roster with a realistic mix of categories, grades, order lengths and flags"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(ORDER_START) + rng.integers(0, 365, size).astype('timedelta64[D]')
+    end = start + rng.integers(0, 730, size).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'service_category': rng.choice([category.value for category in ServiceCategory], size, p=[0.6, 0.3, 0.1]),
+        'grade': rng.choice(get_available_grades(), size),
+        'years_of_service': rng.integers(0, 30, size),
+        'start_date': start,
+        'end_date': end,
+        'has_dependents': rng.random(size) < 0.5,
+        'hazardous_duty': rng.random(size) < 0.3,
+        'hardship_duty': rng.random(size) < 0.3,
+        'at_border': rng.random(size) < 0.5,
+        'present_this_month': rng.random(size) < 0.7,
+    })
+
+def _roster(size):
+    from batch_pay import calculate_total_pay_batch
+
+    members = make_roster(size)
+    return lambda: calculate_total_pay_batch(members)
+
+def _correction_report(kind, months):
+    import report_generators
+
+    if not os.path.exists(report_generators.LOGO_PATH):
+        raise FileNotFoundError(f"{report_generators.LOGO_PATH} not found; run from the app directory")
+    original_start, original_end = _order(months)
+    correct_end = original_end + timedelta(days=10)
+    original = calculate_total_pay(ServiceCategory.ARMY_NG, 'E-4', 6, original_start, original_end,
+                                   True, True, True, True, True)
+    correct = calculate_total_pay(ServiceCategory.ARMY_NG, 'E-5', 6, original_start, correct_end,
+                                  True, True, True, True, True)
+    original_details = {
+        'service_category': ServiceCategory.ARMY_NG.value, 'grade': 'E-4', 'years': 6,
+        'start_date': original_start, 'end_date': original_end, 'dependents': True, 'hazardous_duty': True,
+        'hardship_duty': True, 'at_border': True, 'present_this_month': True,
+    }
+    generate = report_generators.generate_pdf_report if kind == 'pdf' else report_generators.generate_excel_report
+    args = (original, ServiceCategory.ARMY_NG, 'E-5', 6, original_start, correct_end, True, True, True, True,
+            'Doe, John', '1234567890', 'TF East', 'A Co')
+    return lambda: generate(*args, is_correction=True, original_details=original_details, correct_pay=correct)
+
+def benchmark_cases(quick=False):
+    """Return {name: factory}; each factory does its setup and returns the callable to time"""
+    cases = {
+        'rates.get_base_pay_rate': _rate_lookups,
+        'pay.ng.1_month': lambda: _ng_pay(1),
+        'pay.ng.36_months': lambda: _ng_pay(36),
+        'pay.ng.36_months.cached': lambda: _ng_pay(36, cached=True),
+        'pay.texas_sg.1_month': lambda: _texas_pay(1),
+        'pay.texas_sg.36_months': lambda: _texas_pay(36),
+    }
+    for size in ROSTER_SIZES:
+        if not (quick and size > 10_000):
+            cases[f'batch.roster.{size}'] = lambda size=size: _roster(size)
+    for kind in ('pdf', 'xlsx'):
+        for months in REPORT_MONTHS:
+            cases[f'report.{kind}.correction.{months}_months'] = \
+                lambda kind=kind, months=months: _correction_report(kind, months)
+    return cases
+
+def time_case(run, repeat=5, min_time=0.2):
+    """Time one callable; returns per-call seconds over `repeat` rounds of at least min_time each"""
+    timer = timeit.Timer(run)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    rounds = [elapsed / number] + [timer.timeit(number) / number for _ in range(repeat - 1)]
+    return {
+        'min': min(rounds),
+        'median': statistics.median(rounds),
+        'mean': statistics.fmean(rounds),
+        'rounds': repeat,
+        'calls_per_round': number,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(filters=(), quick=False, repeat=5, min_time=0.2):
+    """Run the selected cases and return the results document"""
+    results = {}
+    for name, factory in benchmark_cases(quick).items():
+        if filters and not any(pattern in name for pattern in filters):
+            continue
+        try:
+            run = factory()
+            run()  # Warm up imports and caches outside the timed rounds
+        except FileNotFoundError as e:
+            # Reports need the logo asset, which only exists next to the app
+            print(f"{name:<40} skipped: {e}")
+            continue
+        results[name] = time_case(run, repeat, min_time)
+        print(f"{name:<40} {results[name]['median'] * 1000:12.3f} ms")
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+def compare_results(baseline, current, threshold=0.10):
+    """Print median changes against a baseline run; returns the names that got slower than threshold"""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = result['median'] / before['median'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:<40} {before['median'] * 1000:12.3f} -> {result['median'] * 1000:12.3f} ms"
+              f" ({change:+.1%}){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pay engine and report generation")
+    parser.add_argument('-k', dest='filters', action='append', default=[],
+                        help="Only run cases whose name contains this text (repeatable)")
+    parser.add_argument('--quick', action='store_true', help="Skip the 100k-member roster")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed rounds per case (default: 5)")
+    parser.add_argument('--output', default=None,
+                        help=f"Where to save results (default: {RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument('--compare', default=None, help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.filters, args.quick, args.repeat)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+"""Headless bulk generation of pay statements for every member of a roster.
+
+Usage:
+    python bulk_reports.py roster.csv statements.zip --formats pdf xlsx --workers 8
+    python bulk_reports.py roster.csv out/ --formats --consolidated
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from batch_pay import MEMBER_DEFAULTS, calculate_total_pay_batch, read_roster, roster_errors
+from utils import calculate_total_pay, coerce_service_category
+
+REPORT_FORMATS = ('pdf', 'xlsx')
+MEMBER_INFO_COLUMNS = ('sm_name', 'sm_dodid', 'sm_task_force', 'sm_company')
+MANIFEST_FIELDS = ['row', 'sm_name', 'sm_dodid', 'service_category', 'grade', 'total_days',
+                   'grand_total', 'files', 'status', 'error']
+
+class ReportWriter:
+    """Write report files into a directory, or into a zip archive when the output ends in .zip"""
+
+    def __init__(self, output):
+        self.output = output
+        if output.lower().endswith('.zip'):
+            self._zip = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self._zip = None
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, name, data):
+        if self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            with open(os.path.join(self.output, name), 'wb') as f:
+                f.write(data)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+def _member_record(row):
+    """Turn a roster row into plain Python values that pickle cheaply to a worker"""
+    member = {key: (None if not isinstance(value, str) and pd.isna(value) else value)
+              for key, value in row.items()}
+    for column, default in MEMBER_DEFAULTS.items():
+        member[column] = bool(member.get(column) or default)
+    for column in MEMBER_INFO_COLUMNS:
+        member[column] = '' if member.get(column) is None else str(member[column])
+    return member
+
+def _report_name(row, member, extension):
+    """File name for one member's statement, e.g. 00012_Doe_John.pdf"""
+    label = member['sm_name'] or member['sm_dodid'] or 'member'
+    return f"{row:05d}_{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}.{extension}"
+
+def build_member_reports(row, member, formats):
+    """Run the pay engine for one member and render the requested reports (runs in a worker process)"""
+    # Imported here so the parent process never loads ReportLab/openpyxl
+    from report_generators import generate_excel_report, generate_pdf_report
+
+    category = coerce_service_category(member['service_category'])
+    pay_info = calculate_total_pay(
+        category, member['grade'], member['years_of_service'], member['start_date'], member['end_date'],
+        member['has_dependents'], member['hazardous_duty'], member['hardship_duty'],
+        member['at_border'], member['present_this_month']
+    )
+    args = (pay_info, category, member['grade'], member['years_of_service'], member['start_date'],
+            member['end_date'], member['has_dependents'], member['hazardous_duty'],
+            member['hardship_duty'], member['at_border'], member['sm_name'], member['sm_dodid'],
+            member['sm_task_force'], member['sm_company'])
+
+    files = {}
+    if 'pdf' in formats:
+        files[_report_name(row, member, 'pdf')] = generate_pdf_report(*args)
+    if 'xlsx' in formats:
+        files[_report_name(row, member, 'xlsx')] = generate_excel_report(*args)
+    return pay_info['total_days'], pay_info['grand_total'], files
+
+def write_consolidated_workbooks(members, writer):
+    """Write one consolidated roster workbook per task force (or one for the whole roster).
+
+    Rows that cannot be priced are left out; the per-member pass records them
+    in the manifest with the same error.
+    """
+    from report_generators import generate_roster_workbook
+
+    members = members[roster_errors(members).isna()]
+    breakdown = calculate_total_pay_batch(members)
+    if 'sm_task_force' not in members:
+        writer.write('roster.xlsx', generate_roster_workbook(breakdown, members))
+        return
+
+    task_forces = members['sm_task_force'].fillna('Unassigned').astype(str)
+    for task_force, group in members.groupby(task_forces, sort=True):
+        name = re.sub(r'[^A-Za-z0-9]+', '_', task_force).strip('_') or 'Unassigned'
+        workbook = generate_roster_workbook(breakdown[breakdown['member'].isin(group.index)], group)
+        writer.write(f'roster_{name}.xlsx', workbook)
+
+def generate_bulk_reports(roster_path, output, formats=REPORT_FORMATS, workers=None, consolidated=False):
+    """Generate statements for every roster member in parallel and write them with a manifest.csv.
+
+    With consolidated=True the roster workbooks from write_consolidated_workbooks
+    are added as well. Returns the manifest rows; members that fail are
+    recorded with status 'error' instead of stopping the run.
+    """
+    members = read_roster(roster_path)
+    writer = ReportWriter(output)
+    manifest = []
+    try:
+        if consolidated:
+            write_consolidated_workbooks(members, writer)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for row, (_, record) in enumerate(members.iterrows(), 1):
+                member = _member_record(record)
+                future = executor.submit(build_member_reports, row, member, tuple(formats))
+                futures[future] = (row, member)
+
+            for future in as_completed(futures):
+                row, member = futures[future]
+                entry = {
+                    'row': row,
+                    'sm_name': member['sm_name'],
+                    'sm_dodid': member['sm_dodid'],
+                    'service_category': member['service_category'],
+                    'grade': member['grade'],
+                }
+                try:
+                    total_days, grand_total, files = future.result()
+                except Exception as e:
+                    entry.update(status='error', error=str(e))
+                else:
+                    for name, data in files.items():
+                        writer.write(name, data)
+                    entry.update(total_days=total_days, grand_total=grand_total,
+                                 files=';'.join(files), status='ok')
+                manifest.append(entry)
+
+        manifest.sort(key=lambda entry: entry['row'])
+        buffer = io.StringIO()
+        manifest_writer = csv.DictWriter(buffer, fieldnames=MANIFEST_FIELDS)
+        manifest_writer.writeheader()
+        manifest_writer.writerows(manifest)
+        writer.write('manifest.csv', buffer.getvalue().encode('utf-8'))
+    finally:
+        writer.close()
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate pay statements for every member of a roster")
+    parser.add_argument('roster', help="Roster file (.csv, .xlsx or .parquet)")
+    parser.add_argument('output', help="Output directory, or a .zip file")
+    parser.add_argument('--formats', nargs='*', choices=REPORT_FORMATS, default=list(REPORT_FORMATS),
+                        help="Per-member statement formats (default: pdf xlsx; none with a bare --formats)")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="Also write one consolidated roster workbook per task force")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    manifest = generate_bulk_reports(args.roster, args.output, args.formats, args.workers, args.consolidated)
+    failed = sum(1 for entry in manifest if entry['status'] != 'ok')
+    print(f"Generated statements for {len(manifest) - failed} of {len(manifest)} members into {args.output}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
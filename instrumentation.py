@@ -0,0 +1,220 @@
+"""Stage timers, counters and opt-in profiling for the pay engine and report builders.
+
+Everything is recorded into the process-wide METRICS object:
+
+    with METRICS.timer('report.pdf.build'):
+        doc.build(elements)
+    METRICS.count('assets.miss')
+
+METRICS.snapshot() (or to_json()) returns the totals for a metrics endpoint or
+UI panel. Profiling is off unless PAY_PROFILE=1 is set for the whole process
+or a request turns it on for itself:
+
+    with METRICS.request_profiling(enabled=True, owner=session_id):
+        generate_pdf_report(...)
+
+METRICS.profile(name) then keeps a cProfile summary and the peak traced memory
+of each profiled block in METRICS.profiles, tagged with the request's owner so
+profiles_for(owner) shows a session only its own.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+
+PROFILE_ENV = 'PAY_PROFILE'
+
+# (enabled, owner) set by request_profiling for the current thread or task
+_request_profiling = ContextVar('request_profiling', default=(None, None))
+
+# tracemalloc is process-wide, so concurrent profiles share one tracing session:
+# the first to start starts it and the last to finish stops it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+        tracemalloc.reset_peak()
+
+def _stop_tracing():
+    """Return the peak traced memory and stop tracing if this was the last profile using it"""
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+        return peak_memory
+
+class Metrics:
+    """Thread-safe stage timers and counters, plus the last few request profiles"""
+
+    def __init__(self, max_profiles=20, profile_lines=25):
+        self.profiling = os.environ.get(PROFILE_ENV, '') not in ('', '0')
+        self.profiles = deque(maxlen=max_profiles)
+        self.profile_lines = profile_lines
+        self._timers = {}
+        self._counters = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Add one timing for a stage"""
+        with self._lock:
+            stats = self._timers.get(name)
+            if stats is None:
+                self._timers[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block as one run of a stage (errors included)"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - start)
+
+    def timed(self, name, profile=False):
+        """Decorator form of timer(); with profile=True each call is also a profile() request"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if profile:
+                    with self.profile(name), self.timer(name):
+                        return function(*args, **kwargs)
+                with self.timer(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, amount=1):
+        """Increase a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def add_source(self, name, stats):
+        """Include stats() (e.g. a cache's hit/miss counters) in every snapshot under name"""
+        self._sources[name] = stats
+
+    @contextmanager
+    def request_profiling(self, enabled=None, owner=None):
+        """Turn profiling on or off for profile() blocks run inside this block, on this thread only.
+
+        enabled=None keeps the process-wide setting; owner tags the profiles
+        recorded so profiles_for(owner) can find them.
+        """
+        token = _request_profiling.set((enabled, owner))
+        try:
+            yield
+        finally:
+            _request_profiling.reset(token)
+
+    @contextmanager
+    def profile(self, name, enabled=None):
+        """Profile the enclosed block with cProfile and tracemalloc when profiling is on.
+
+        `enabled` overrides request_profiling, which overrides the
+        process-wide setting. Only one profiler can run at a time, so a block
+        that starts while another thread is being profiled runs unprofiled
+        (on Python 3.12+) and is kept as an entry with a 'skipped' reason;
+        the peak memory of overlapping profiles is shared.
+        """
+        requested, owner = _request_profiling.get()
+        if enabled is None:
+            enabled = self.profiling if requested is None else requested
+        if not enabled:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile profiler per process; record the
+            # block as skipped so the request does not silently lose its profile
+            self.count('profile.skipped')
+            self.profiles.append({
+                'name': name,
+                'owner': owner,
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'skipped': "another report was being profiled at the same time",
+            })
+            yield
+            return
+        _start_tracing()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = perf_counter() - start
+            peak_memory = _stop_tracing()
+
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(self.profile_lines)
+            self.profiles.append({
+                'name': name,
+                'owner': owner,
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'seconds': seconds,
+                'peak_memory_bytes': peak_memory,
+                'stats': stream.getvalue(),
+            })
+
+    def profiles_for(self, owner):
+        """The kept profiles recorded for one owner, oldest first"""
+        return [profile for profile in list(self.profiles) if profile['owner'] == owner]
+
+    def snapshot(self, include_profiles=False, owner=None):
+        """Return timers (count/total/mean/max seconds), counters and source stats as plain data.
+
+        With include_profiles, an owner limits the profiles to that owner's.
+        """
+        with self._lock:
+            timers = {
+                name: {'count': count, 'total': total, 'mean': total / count, 'max': longest}
+                for name, (count, total, longest) in sorted(self._timers.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        snapshot = {
+            'timers': timers,
+            'counters': counters,
+            'sources': {name: stats() for name, stats in self._sources.items()},
+        }
+        if include_profiles:
+            snapshot['profiles'] = list(self.profiles) if owner is None else self.profiles_for(owner)
+        return snapshot
+
+    def to_json(self, include_profiles=False, owner=None):
+        """Snapshot as a JSON document"""
+        return json.dumps(self.snapshot(include_profiles, owner), indent=2)
+
+    def reset(self):
+        """Clear timers, counters and profiles (sources keep their own counters)"""
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+        self.profiles.clear()
+
+METRICS = Metrics()
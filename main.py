@@ -1,182 +1,150 @@
-hazard_pay': 0, 'hardship_pay': 0, 'danger_pay': 0,
-                    'special_pay': 0, 'allowances': 0, 'total': 0, 'per_diem': 0, 'minimum_income_adjustment':0
-                })
-                corr_month = correct_pay['monthly_breakdown'].get(month, {
-                'days': 0, 'base_pay': 0, 'bah': 0, 'bas': 0,
-                'hazard_pay': 0, 'hardship_pay': 0, 'danger_pay': 0,
-                'special_pay': 0, 'allowances': 0, 'total': 0, 'per_diem': 0, 'minimum_income_adjustment':0
-            })
+    # Monthly comparison as one table; selecting months expands their component breakdown
+    if 'original_pay' in st.session_state and 'correct_pay' in st.session_state:
+        from app_cache import monthly_comparison
+
+        summary, breakdown = monthly_comparison(st.session_state.original_pay, st.session_state.correct_pay)
+        money = {column: st.column_config.NumberColumn(column, format="dollar")
+                 for column in ('Original', 'Correct', 'Difference')}
+        selection = st.dataframe(
+            summary,
+            column_config=money,
+            hide_index=True,
+            width="stretch",
+            on_select="rerun",
+            selection_mode="multi-row",
+            key="monthly_comparison",
+        )
+        show_all = st.toggle("Show the component breakdown for every month", key="expand_all_months")
+        if show_all or selection.selection.rows:
+            if not show_all:
+                selected = summary['Month'].iloc[selection.selection.rows]
+                breakdown = breakdown[breakdown['Month'].isin(selected)]
+            st.dataframe(breakdown, column_config=money, hide_index=True, width="stretch")
+        else:
+            st.caption("Select months in the table to see their component breakdown.")
+
+    # Add report generation buttons for correction comparison. Reports are built
+    # in the background so the page stays interactive while ReportLab runs.
+    from uuid import uuid4
+    from app_cache import submit_correction_report
+    from report_jobs import REPORT_JOBS, DONE, FAILED, JobLimitError
 
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.write("Original Pay:")
-                st.write(f"Base Pay: {format_currency(orig_month['base_pay'])}")
-                if ServiceCategory(original_service_category) == ServiceCategory.TEXAS_SG:
-                    st.write(f"Special Pay: {format_currency(orig_month.get('special_pay', 0))}")
-                    st.write(f"Allowances: {format_currency(orig_month.get('allowances', 0))}")
-                else:
-                    st.write(f"BAH: {format_currency(orig_month['bah'])}")
-                    st.write(f"BAS: {format_currency(orig_month['bas'])}")
-                    st.write(f"Per Diem: {format_currency(orig_month['per_diem'])}")
-                    if original_present_this_month:
-                        if original_hazardous_duty:
-                            st.write(f"Hazard Pay: {format_currency(orig_month.get('hazard_pay', 0))}")
-                        if original_hardship_duty:
-                            st.write(f"Hardship Pay: {format_currency(orig_month.get('hardship_pay', 0))}")
-                        if original_at_border:
-                            st.write(f"Danger Pay: {format_currency(orig_month.get('danger_pay', 0))}")
-                    if orig_month.get('minimum_income_adjustment', 0)>0:
-                        st.write(f"Min Income Adj: {format_currency(orig_month['minimum_income_adjustment'])}")
-                st.write(f"Total: {format_currency(orig_month['total'])}")
-
-
-            with col2:
-                st.write("Correct Pay:")
-                st.write(f"Base Pay: {format_currency(corr_month['base_pay'])}")
-                if ServiceCategory(correct_service_category) == ServiceCategory.TEXAS_SG:
-                    st.write(f"Special Pay: {format_currency(corr_month.get('special_pay', 0))}")
-                    st.write(f"Allowances: {format_currency(corr_month.get('allowances', 0))}")
-                else:
-                    st.write(f"BAH: {format_currency(corr_month['bah'])}")
-                    st.write(f"BAS: {format_currency(corr_month['bas'])}")
-                    st.write(f"Per Diem: {format_currency(corr_month['per_diem'])}")
-                    if correct_present_this_month:
-                        if correct_hazardous_duty:
-                            st.write(f"Hazard Pay: {format_currency(corr_month.get('hazard_pay', 0))}")
-                        if correct_hardship_duty:
-                            st.write(f"Hardship Pay: {format_currency(corr_month.get('hardship_pay', 0))}")
-                        if correct_at_border:
-                            st.write(f"Danger Pay: {format_currency(corr_month.get('danger_pay', 0))}")
-                    if corr_month.get('minimum_income_adjustment', 0)>0:
-                        st.write(f"Min Income Adj: {format_currency(corr_month['minimum_income_adjustment'])}")
-                st.write(f"Total: {format_currency(corr_month['total'])}")
-
-            with col3:
-                st.write("Difference:")
-                base_diff = corr_month['base_pay'] - orig_month['base_pay']
-                st.write(f"Base Pay: {format_currency(base_diff)}")
-
-                if ServiceCategory(original_service_category) == ServiceCategory.TEXAS_SG:
-                    special_diff = corr_month.get('special_pay', 0) - orig_month.get('special_pay', 0)
-                    allowances_diff = corr_month.get('allowances', 0) - orig_month.get('allowances', 0)
-                    st.write(f"Special Pay: {format_currency(special_diff)}")
-                    st.write(f"Allowances: {format_currency(allowances_diff)}")
-                else:
-                    bah_diff = corr_month['bah'] - orig_month['bah']
-                    bas_diff = corr_month['bas'] - orig_month['bas']
-                    per_diem_diff = corr_month['per_diem'] - orig_month['per_diem']
-                    min_income_adj_diff = corr_month.get('minimum_income_adjustment', 0) - orig_month.get('minimum_income_adjustment', 0)
-
-                    st.write(f"BAH: {format_currency(bah_diff)}")
-                    st.write(f"BAS: {format_currency(bas_diff)}")
-                    st.write(f"Per Diem: {format_currency(per_diem_diff)}")
-
-                    if min_income_adj_diff != 0:
-                        st.write(f"Min Income Adj: {format_currency(min_income_adj_diff)}")
-
-                    if original_present_this_month or correct_present_this_month:
-                        hazard_diff = corr_month.get('hazard_pay', 0) - orig_month.get('hazard_pay', 0)
-                        hardship_diff = corr_month.get('hardship_pay', 0) - orig_month.get('hardship_pay', 0)
-                        danger_diff = corr_month.get('danger_pay', 0) - orig_month.get('danger_pay', 0)
-
-                        if original_hazardous_duty or correct_hazardous_duty:
-                            st.write(f"Hazard Pay: {format_currency(hazard_diff)}")
-                        if original_hardship_duty or correct_hardship_duty:
-                            st.write(f"Hardship Pay: {format_currency(hardship_diff)}")
-                        if original_at_border or correct_at_border:
-                            st.write(f"Danger Pay: {format_currency(danger_diff)}")
-
-                total_diff = corr_month['total'] - orig_month['total']
-                st.metric(
-                    "Monthly Difference",
-                    format_currency(abs(total_diff)),
-                    delta=format_currency(total_diff)
-                )
-
-    # Add report generation buttons for correction comparison
     st.subheader("📄 Generate Correction Reports")
-    col1, col2 = st.columns(2)
-
-    with col1:
-        if st.button("Generate Correction PDF Report", key="btn_pdf_report") and 'original_pay' in st.session_state:
-            try:
-                original_pay = st.session_state.original_pay
-                pdf_file = generate_pdf_report(
-                    original_pay,
-                    ServiceCategory(correct_service_category),
-                    correct_grade,
-                    correct_years,
-                    correct_start_date,
-                    correct_end_date,
-                    correct_dependents,
-                    correct_hazardous_duty,
-                    correct_hardship_duty,
-                    correct_at_border,
-                    sm_name,
-                    sm_dodid,
-                    sm_task_force,
-                    sm_company,
-                    is_correction=True,
-                    original_details={
-                        'service_category': original_service_category,
-                        'grade': original_grade,
-                        'years': original_years,
-                        'start_date': original_start_date,
-                        'end_date': original_end_date,
-                        'dependents': original_dependents,
-                        'hazardous_duty': original_hazardous_duty,
-                        'hardship_duty': original_hardship_duty,
-                        'at_border': original_at_border,
-                        'present_this_month': original_present_this_month
-                    }
-                )
-                st.markdown(
-                    get_download_link(pdf_file, "📥 Download Correction PDF Report"),
-                    unsafe_allow_html=True
-                )
-            except Exception as e:
-                st.error(f"Error generating PDF report: {str(e)}")
-
-    with col2:
-        if st.button("Generate Correction Excel Report", key="btn_excel_report") and 'original_pay' in st.session_state:
-            try:
-                original_pay = st.session_state.original_pay
-                excel_file = generate_excel_report(
-                    original_pay,
-                    ServiceCategory(correct_service_category),
-                    correct_grade,
-                    correct_years,
-                    correct_start_date,
-                    correct_end_date,
-                    correct_dependents,
-                    correct_hazardous_duty,
-                    correct_hardship_duty,
-                    correct_at_border,
-                    sm_name,
-                    sm_dodid,
-                    sm_task_force,
-                    sm_company,
-                    is_correction=True,
-                    original_details={
-                        'service_category': original_service_category,
-                        'grade': original_grade,
-                        'years': original_years,
-                        'start_date': original_start_date,
-                        'end_date': original_end_date,
-                        'dependents': original_dependents,
-                        'hazardous_duty': original_hazardous_duty,
-                        'hardship_duty': original_hardship_duty,
-                        'at_border': original_at_border,
-                        'present_this_month': original_present_this_month
-                    }
-                )
-                st.markdown(
-                    get_download_link(excel_file, "📥 Download Correction Excel Report"),
-                    unsafe_allow_html=True
-                )
-            except Exception as e:
-                st.error(f"Error generating Excel report: {str(e)}")
+    report_owner = st.session_state.setdefault('report_owner', uuid4().hex)
+    report_jobs = st.session_state.setdefault('report_jobs', {})
+
+    def submit_report(kind):
+        """Queue a correction report for the current inputs (reused if they are unchanged)"""
+        report_jobs[kind] = submit_correction_report(
+            kind,
+            st.session_state.original_pay,
+            st.session_state.correct_pay,
+            ServiceCategory(correct_service_category),
+            correct_grade,
+            correct_years,
+            correct_start_date,
+            correct_end_date,
+            correct_dependents,
+            correct_hazardous_duty,
+            correct_hardship_duty,
+            correct_at_border,
+            sm_name,
+            sm_dodid,
+            sm_task_force,
+            sm_company,
+            original_details={
+                'service_category': original_service_category,
+                'grade': original_grade,
+                'years': original_years,
+                'start_date': original_start_date,
+                'end_date': original_end_date,
+                'dependents': original_dependents,
+                'hazardous_duty': original_hazardous_duty,
+                'hardship_duty': original_hardship_duty,
+                'at_border': original_at_border,
+                'present_this_month': original_present_this_month
+            },
+            owner=report_owner,
+            profile=st.session_state.get('profile_reports', False) or None
+        )
+
+    report_buttons = {
+        'pdf': ("PDF", "pay_correction_report.pdf", "application/pdf"),
+        'xlsx': ("Excel", "pay_correction_report.xlsx",
+                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    }
+    jobs_active = any(job is not None and job.active for job in map(REPORT_JOBS.get, report_jobs.values()))
+
+    # Polls once a second while a report is being built, then goes quiet
+    @st.fragment(run_every=1 if jobs_active else None)
+    def report_job_status():
+        for column, (kind, (label, file_name, mime)) in zip(st.columns(2), report_buttons.items()):
+            with column:
+                if st.button(f"Generate Correction {label} Report", key=f"btn_{kind}_report") \
+                        and 'original_pay' in st.session_state:
+                    try:
+                        submit_report(kind)
+                    except JobLimitError as e:
+                        st.warning(str(e))
+                if kind not in report_jobs:
+                    continue
+                job = REPORT_JOBS.get(report_jobs[kind])
+                if job is None:
+                    del report_jobs[kind]
+                    st.caption("The report expired; generate it again.")
+                elif job.active:
+                    st.progress(job.progress, text=f"Building {label} report ({job.status})...")
+                elif job.status == DONE:
+                    st.download_button(
+                        f"📥 Download Correction {label} Report",
+                        data=job.result,
+                        file_name=file_name,
+                        mime=mime,
+                        key=f"dl_{kind}_report"
+                    )
+                elif job.status == FAILED:
+                    st.error(f"Error generating {label} report: {job.error}")
+        # Rerun the whole page once the last job finishes so polling stops
+        still_active = any(job is not None and job.active for job in map(REPORT_JOBS.get, report_jobs.values()))
+        if jobs_active != still_active:
+            st.rerun()
+
+    report_job_status()
+
+# Performance panel: per-stage timings and counters for this server process
+from instrumentation import METRICS
+
+with st.sidebar.expander("⏱️ Performance"):
+    # Applies to this session's reports only; PAY_PROFILE=1 profiles every report
+    st.checkbox("Profile my report generation", value=METRICS.profiling, key="profile_reports")
+    profile_owner = st.session_state.get('report_owner')
+    metrics = METRICS.snapshot()
+    if metrics['timers']:
+        st.dataframe(
+            [
+                {
+                    'Stage': name,
+                    'Calls': timer['count'],
+                    'Mean (ms)': round(timer['mean'] * 1000, 1),
+                    'Max (ms)': round(timer['max'] * 1000, 1),
+                    'Total (s)': round(timer['total'], 2),
+                }
+                for name, timer in metrics['timers'].items()
+            ],
+            hide_index=True,
+        )
+    else:
+        st.caption("No timings recorded yet.")
+    st.json({'counters': metrics['counters'], **metrics['sources']}, expanded=False)
+    for profile in reversed(METRICS.profiles_for(profile_owner) if profile_owner else []):
+        if 'skipped' in profile:
+            st.caption(f"{profile['name']} at {profile['timestamp']} was not profiled: {profile['skipped']}")
+            continue
+        st.caption(f"{profile['name']} at {profile['timestamp']}: {profile['seconds']:.2f}s, "
+                   f"peak {profile['peak_memory_bytes'] / 1_048_576:.1f} MiB")
+        st.code(profile['stats'], language=None)
+    st.download_button("Download metrics (JSON)", data=METRICS.to_json(include_profiles=bool(profile_owner), owner=profile_owner),
+                       file_name="pay_metrics.json", mime="application/json", key="dl_metrics")
 
 # Footer with signature
 st.markdown("---")
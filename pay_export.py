@@ -0,0 +1,116 @@
+"""Columnar export of batch pay results as Arrow tables and partitioned Parquet datasets."""
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from utils import (
+    MonthlyPay, PayResult, ServiceCategory, TEXAS_SG_MONTH_FIELDS, get_rate_table
+)
+
+PAY_SCHEMA_VERSION = '1'
+
+# Partition columns, outermost first
+PARTITION_COLUMNS = ['pay_period', 'service_category']
+
+# Stable schema for per-member, per-month pay rows
+PAY_RESULT_SCHEMA = pa.schema([
+    ('member_id', pa.string()),
+    ('service_category', pa.string()),
+    ('grade', pa.string()),
+    ('pay_period', pa.string()),  # 'YYYY-MM'
+    ('year', pa.int16()),
+    ('month', pa.int8()),
+    ('month_key', pa.string()),
+    ('daily_base_rate', pa.float64()),
+    ('daily_bah_rate', pa.float64()),
+    ('daily_bas_rate', pa.float64()),
+    ('daily_adjustment_rate', pa.float64()),
+    ('days', pa.int32()),
+    ('base_pay', pa.float64()),
+    ('bah', pa.float64()),
+    ('bas', pa.float64()),
+    ('per_diem', pa.float64()),
+    ('minimum_income_adjustment', pa.float64()),
+    ('hazard_pay', pa.float64()),
+    ('hardship_pay', pa.float64()),
+    ('danger_pay', pa.float64()),
+    ('special_pay', pa.float64()),
+    ('allowances', pa.float64()),
+    ('total', pa.float64()),
+], metadata={'pay_schema_version': PAY_SCHEMA_VERSION})
+
+def results_to_arrow(breakdown):
+    """Convert a calculate_total_pay_batch result into an Arrow table with PAY_RESULT_SCHEMA"""
+    frame = breakdown.assign(
+        member_id=breakdown['member'].astype(str),
+        pay_period=[f"{year:04d}-{month:02d}" for year, month in zip(breakdown['year'], breakdown['month'])],
+    )
+    return pa.Table.from_pandas(frame[PAY_RESULT_SCHEMA.names], schema=PAY_RESULT_SCHEMA, preserve_index=False)
+
+def write_pay_parquet(breakdown, root, existing_data_behavior='overwrite_or_ignore'):
+    """Write batch pay results as a Parquet dataset partitioned by pay period and service category.
+
+    Files land in hive-style directories (pay_period=2024-01/service_category=...),
+    so readers can prune by period or category without opening other files.
+    """
+    ds.write_dataset(
+        results_to_arrow(breakdown), root, format='parquet',
+        partitioning=ds.partitioning(pa.schema([PAY_RESULT_SCHEMA.field(name) for name in PARTITION_COLUMNS]), flavor='hive'),
+        existing_data_behavior=existing_data_behavior,
+    )
+
+def read_pay_table(root, member_ids=None, pay_periods=None, service_categories=None):
+    """Read a pay dataset back as an Arrow table, optionally filtered, sorted by member and month"""
+    dataset = ds.dataset(root, format='parquet', schema=PAY_RESULT_SCHEMA, partitioning='hive')
+    conditions = []
+    if member_ids is not None:
+        conditions.append(pc.field('member_id').isin([str(member) for member in member_ids]))
+    if pay_periods is not None:
+        conditions.append(pc.field('pay_period').isin(list(pay_periods)))
+    if service_categories is not None:
+        conditions.append(pc.field('service_category').isin(list(service_categories)))
+
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    table = dataset.to_table(filter=condition)
+    return table.sort_by([('member_id', 'ascending'), ('year', 'ascending'), ('month', 'ascending')])
+
+def read_pay_results(root, **filters):
+    """Load a pay dataset into {member_id: pay dict} in the shape calculate_total_pay returns.
+
+    Accepts the same filters as read_pay_table. With a pay period filter the
+    dicts only hold the selected months, and grand_total covers just those.
+    """
+    rows_by_member = {}
+    for row in read_pay_table(root, **filters).to_pylist():
+        rows_by_member.setdefault(row['member_id'], []).append(row)
+
+    results = {}
+    for member_id, rows in rows_by_member.items():
+        first, last = rows[0], rows[-1]
+        # Daily rates are the ones in force on the order's last day, which is
+        # at least `days` days into its last month
+        rate_table = get_rate_table(date(last['year'], last['month'], last['days']))
+        texas_sg = first['service_category'] == ServiceCategory.TEXAS_SG.value
+        component_fields = TEXAS_SG_MONTH_FIELDS[1:]
+        months = tuple(
+            MonthlyPay(row['year'], row['month'], row['days'], **{field: row[field] for field in component_fields})
+            for row in rows
+        )
+        total_days = sum(month.days for month in months)
+        grand_total = round(sum(month.total for month in months), 2)
+        if texas_sg:
+            result = PayResult(True, last['daily_base_rate'], months, total_days, grand_total,
+                               daily_special_rate=rate_table.texas_sg['special_pay'],
+                               daily_allowance_rate=rate_table.texas_sg['daily_allowance'])
+        else:
+            result = PayResult(False, last['daily_base_rate'], months, total_days, grand_total,
+                               daily_bah_rate=last['daily_bah_rate'],
+                               daily_bas_rate=last['daily_bas_rate'],
+                               daily_per_diem_rate=rate_table.per_diem,
+                               daily_adjustment_rate=last['daily_adjustment_rate'])
+        results[member_id] = result.to_dict()
+    return results
@@ -0,0 +1,347 @@
+"""HTTP/JSON API for the pay engine, for systems that need to call it without the Streamlit UI.
+
+The event loop only parses requests and writes responses; pay calculations
+and reports run in a process pool so one long report never stalls other
+callers.
+
+Usage:
+    python pay_service.py --host 127.0.0.1 --port 8080 --workers 4
+
+Endpoints (orders use the roster column names, dates as YYYY-MM-DD, flags as
+true/false; grade is required except for Texas State Guard orders):
+    GET  /health
+    GET  /metrics                        stage timings of the service process
+    POST /calculate   {order}            -> calculate_total_pay result
+    POST /batch       {"orders": [...]}  -> {"results": [...]}, failed orders get status "error"
+    POST /correction  {"original": {order}, "correct": {order}}
+    POST /report      {"format": "pdf"|"xlsx", "order": {order}, "original": {order}?}
+                                         -> the report file; with "original" a correction report
+
+    {"service_category": "Army National Guard", "grade": "E-5", "years_of_service": 6,
+     "start_date": "2024-01-01", "end_date": "2024-03-31", "has_dependents": true, ...}
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+from http import HTTPStatus
+
+from instrumentation import METRICS
+from utils import (
+    NG_MONTH_FIELDS, TEXAS_SG_MONTH_FIELDS, ServiceCategory, calculate_total_pay, coerce_service_category,
+    diff_pay
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+BATCH_CHUNK_SIZE = 200  # Orders per worker task for /batch
+REQUIRED_ORDER_FIELDS = ('service_category', 'start_date', 'end_date')
+ORDER_FLAGS = ('has_dependents', 'hazardous_duty', 'hardship_duty', 'at_border', 'present_this_month')
+MEMBER_INFO_FIELDS = ('sm_name', 'sm_dodid', 'sm_task_force', 'sm_company')
+# original_details keys for correction reports, in parse_order's argument order
+ORIGINAL_DETAIL_KEYS = ('service_category', 'grade', 'years', 'start_date', 'end_date', 'dependents',
+                        'hazardous_duty', 'hardship_duty', 'at_border', 'present_this_month')
+REPORT_TYPES = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+class HTTPError(Exception):
+    """Error answered with the given status and a JSON {"error": message} body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class RawResponse:
+    """A handler result sent as a file download instead of JSON"""
+
+    def __init__(self, data, content_type, filename):
+        self.data = data
+        self.content_type = content_type
+        self.filename = filename
+
+def _parse_date(value, field):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a YYYY-MM-DD date, got {value!r}") from None
+
+def _parse_flag(order, field):
+    value = order.get(field, False)
+    if not isinstance(value, bool):
+        raise ValueError(f"{field} must be true or false, got {value!r}")
+    return value
+
+def parse_order(order):
+    """Validate a JSON order and return calculate_total_pay's positional arguments"""
+    if not isinstance(order, dict):
+        raise ValueError("An order must be a JSON object")
+    missing = [field for field in REQUIRED_ORDER_FIELDS if order.get(field) is None]
+    if missing:
+        raise ValueError(f"Missing order field(s): {', '.join(missing)}")
+
+    if not isinstance(order['service_category'], str):
+        raise ValueError(f"service_category must be a string, got {order['service_category']!r}")
+    category = coerce_service_category(order['service_category'])
+    grade = order.get('grade')
+    if category != ServiceCategory.TEXAS_SG and not (isinstance(grade, str) and grade):
+        raise ValueError(f"grade must be a pay grade such as 'E-5' for {category.value} orders, got {grade!r}")
+    start_date = _parse_date(order['start_date'], 'start_date')
+    end_date = _parse_date(order['end_date'], 'end_date')
+    if end_date < start_date:
+        raise ValueError("end_date is before start_date")
+    years = order.get('years_of_service')
+    if years is None:
+        years = 0
+    elif isinstance(years, bool) or not isinstance(years, (int, float)) or not math.isfinite(years):
+        raise ValueError(f"years_of_service must be a number, got {years!r}")
+    flags = [_parse_flag(order, flag) for flag in ORDER_FLAGS]
+    return (category, grade, int(years), start_date, end_date, *flags)
+
+# Worker-process entry points; they take and return plain JSON-ready data
+
+def calculate_order(order):
+    """Pay for one order"""
+    return calculate_total_pay(*parse_order(order))
+
+def calculate_orders(orders):
+    """Pay for a chunk of orders; a bad order gets an error entry instead of failing the chunk"""
+    results = []
+    for order in orders:
+        try:
+            results.append({'status': 'ok', **calculate_order(order)})
+        except ValueError as e:
+            results.append({'status': 'error', 'error': str(e)})
+    return results
+
+def calculate_correction(original, correct):
+    """Original vs. correct pay for one order, with per-month and per-component differences"""
+    original_pay, correct_pay = calculate_order(original), calculate_order(correct)
+    pay_diff = diff_pay(original_pay, correct_pay)
+    # Texas SG months carry special pay and allowances on top of the NG components
+    texas_sg = 'daily_special_rate' in original_pay or 'daily_special_rate' in correct_pay
+    fields = [field for field in (TEXAS_SG_MONTH_FIELDS if texas_sg else NG_MONTH_FIELDS) if field != 'total']
+    return {
+        'original_total': pay_diff.original_total,
+        'correct_total': pay_diff.correct_total,
+        'difference': round(pay_diff.difference, 2),
+        'underpayment': pay_diff.underpayment,
+        'overpayment': pay_diff.overpayment,
+        'months': [
+            {
+                'month': month.key,
+                'original_total': month.original.total,
+                'correct_total': month.correct.total,
+                'difference': round(month.total, 2),
+                'deltas': {field: round(month.delta(field), 2) for field in fields},
+            }
+            for month in pay_diff.months
+        ],
+        'original': original_pay,
+        'correct': correct_pay,
+    }
+
+def build_report(kind, order, original=None):
+    """Render a pay report, or a correction report when the original order is given"""
+    # Imported here so the service process never loads ReportLab/openpyxl
+    from report_generators import generate_excel_report, generate_pdf_report
+
+    args = parse_order(order)
+    generate = generate_pdf_report if kind == 'pdf' else generate_excel_report
+    # Reports take the order's fields without present_this_month, then the member details
+    report_args = (*args[:9], *(str(order.get(field) or '') for field in MEMBER_INFO_FIELDS))
+    if original is None:
+        return generate(calculate_total_pay(*args), *report_args)
+
+    original_args = parse_order(original)
+    original_details = dict(zip(ORIGINAL_DETAIL_KEYS, original_args))
+    original_details['service_category'] = original_args[0].value
+    return generate(calculate_total_pay(*original_args), *report_args, is_correction=True,
+                    original_details=original_details, correct_pay=calculate_total_pay(*args))
+
+class PayService:
+    """Routes requests and runs the CPU-bound work in a process pool"""
+
+    def __init__(self, workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.metrics,
+            ('POST', '/calculate'): self.calculate,
+            ('POST', '/batch'): self.batch,
+            ('POST', '/correction'): self.correction,
+            ('POST', '/report'): self.report,
+        }
+
+    async def run(self, function, *args):
+        """Run a worker entry point in the pool; bad input comes back as a 400"""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, partial(function, *args))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e)) from None
+
+    async def health(self, body):
+        return {'status': 'ok'}
+
+    async def metrics(self, body):
+        return METRICS.snapshot()
+
+    async def calculate(self, body):
+        return await self.run(calculate_order, body)
+
+    async def batch(self, body):
+        orders = body.get('orders') if isinstance(body, dict) else None
+        if not isinstance(orders, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Expected {"orders": [...]}')
+        METRICS.count('service.batch.orders', len(orders))
+        chunks = [orders[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(orders), BATCH_CHUNK_SIZE)]
+        results = await asyncio.gather(*(self.run(calculate_orders, chunk) for chunk in chunks))
+        return {'results': [result for chunk in results for result in chunk]}
+
+    async def correction(self, body):
+        if not isinstance(body, dict) or 'original' not in body or 'correct' not in body:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Expected {"original": {...}, "correct": {...}}')
+        return await self.run(calculate_correction, body['original'], body['correct'])
+
+    async def report(self, body):
+        if not isinstance(body, dict) or 'order' not in body:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Expected {"format": ..., "order": {...}}')
+        kind = body.get('format', 'pdf')
+        if kind not in REPORT_TYPES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"format must be one of: {', '.join(REPORT_TYPES)}")
+        data = await self.run(build_report, kind, body['order'], body.get('original'))
+        return RawResponse(data, REPORT_TYPES[kind], f'pay_report.{kind}')
+
+    async def dispatch(self, method, path, body):
+        """Handle one request and return (status, content type, body bytes, extra headers)"""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON") from None
+        else:
+            body = {}
+        with METRICS.timer(f'service{path.replace("/", ".")}'):
+            result = await handler(body)
+        if isinstance(result, RawResponse):
+            return (HTTPStatus.OK, result.content_type, result.data,
+                    {'Content-Disposition': f'attachment; filename="{result.filename}"'})
+        return HTTPStatus.OK, 'application/json', json.dumps(result).encode('utf-8'), {}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    response = await self.dispatch(method, path, body)
+                except HTTPError as e:
+                    METRICS.count('service.errors')
+                    keep_alive = e.status < 500 and e.status != HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    response = _error_response(e.status, str(e))
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception:
+                    logger.exception("Request failed")
+                    METRICS.count('service.errors')
+                    keep_alive = False
+                    response = _error_response(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal server error")
+                METRICS.count('service.requests')
+                writer.write(_encode_response(*response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+async def _read_request(reader):
+    """Read one request; returns (method, path, headers, body), or None when the client closed"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body over {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+def _error_response(status, message):
+    return status, 'application/json', json.dumps({'error': message}).encode('utf-8'), {}
+
+def _encode_response(status, content_type, body, extra_headers, keep_alive):
+    status = HTTPStatus(status)
+    headers = {
+        'Content-Type': content_type,
+        'Content-Length': str(len(body)),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+        **extra_headers,
+    }
+    head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+    head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return (head + "\r\n").encode('latin-1') + body
+
+async def serve(host='127.0.0.1', port=8080, workers=None):
+    """Run the service until cancelled"""
+    service = PayService(workers)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logger.info("Pay service listening on %s", ', '.join(str(s.getsockname()) for s in server.sockets))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the pay calculator as an HTTP/JSON API")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for calculations and reports (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,29 +1,93 @@
-import streamlit as st
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.drawing.image import Image as XLImage
-from openpyxl.utils.cell import get_column_letter
+# ReportLab, openpyxl and PIL are imported inside the functions that use them,
+# so importing this module (e.g. for report_filename) stays cheap
 from datetime import datetime
-from utils import ServiceCategory
-from PIL import Image as PILImage
+from functools import lru_cache
+from instrumentation import METRICS
+from utils import ServiceCategory, diff_pay
 import io
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = 'attached_assets/NEW LOGO SMALL.png'
+
+class AssetCache:
+    """Process-wide cache of prepared image assets, reloaded only when the file's mtime changes"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, path, loader):
+        """Return loader(path), reusing the previous result while the file is unchanged"""
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                METRICS.count('assets.hit')
+                return entry[1]
+        METRICS.count('assets.miss')
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = (mtime, value)
+        return value
+
+    def clear(self):
+        """Forget every cached asset"""
+        with self._lock:
+            self._entries.clear()
+
+ASSET_CACHE = AssetCache()
+
+@METRICS.timed('logo.pdf.load')
+def _load_pdf_logo(path):
+    """Decode the logo once into a ReportLab ImageReader"""
+    from PIL import Image as PILImage
+    from reportlab.lib.utils import ImageReader
+
+    img = PILImage.open(path)
+    img.load()
+    reader = ImageReader(img)
+    # Decode the pixel data up front so every page reuses it
+    reader.getRGBData()
+    return reader
+
+def get_pdf_logo():
+    """Return the cached header logo for PDF reports"""
+    return ASSET_CACHE.get('pdf_logo', LOGO_PATH, _load_pdf_logo)
+
+@METRICS.timed('logo.excel.load')
+def _load_excel_logo(path):
+    """Resize the logo for Excel once and keep it as PNG bytes"""
+    from PIL import Image as PILImage
+
+    img = PILImage.open(path)
+    desired_width = 200
+    ratio = desired_width / float(img.size[0])
+    desired_height = int(float(img.size[1]) * ratio)
+    img = img.resize((desired_width, desired_height), PILImage.Resampling.LANCZOS)
 
-def add_header_logo(canvas, doc):
-    """Add logo to the header of each page"""
-    img = PILImage.open('attached_assets/NEW LOGO SMALL.png')
     img_buffer = io.BytesIO()
     img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
+    return img_buffer.getvalue()
+
+def get_excel_logo():
+    """Return a new openpyxl image of the cached, resized logo for one workbook"""
+    from openpyxl.drawing.image import Image as XLImage
 
-    header_logo = Image(img_buffer)
-    header_logo.drawHeight = 1.5*inch
-    header_logo.drawWidth = 1.5*inch
-    header_logo.drawOn(canvas, doc.leftMargin, doc.pagesize[1] - 2*inch)
+    # Each workbook needs its own Image object, but they all share the same bytes
+    return XLImage(io.BytesIO(ASSET_CACHE.get('excel_logo', LOGO_PATH, _load_excel_logo)))
+
+def add_header_logo(canvas, doc):
+    """Add logo to the header of each page"""
+    from reportlab.lib.units import inch
+
+    # The canvas keys image XObjects by content, so the same cached reader is
+    # embedded once per document and referenced from every page
+    canvas.drawImage(get_pdf_logo(), doc.leftMargin, doc.pagesize[1] - 2*inch,
+                     width=1.5*inch, height=1.5*inch, mask='auto')
 
 def add_watermark(canvas, doc):
     """
@@ -67,18 +131,71 @@ def get_special_duty_text(hazardous_duty, hardship_duty, at_border, present_this
 
     return "\n".join(duties) if duties else "No Special Duty Pay Selected"
 
+def get_breakdown_components(service_category):
+    """Return the (label, field) pairs shown in a monthly breakdown comparison"""
+    if service_category == ServiceCategory.TEXAS_SG:
+        return [
+            ("Base Pay", 'base_pay'),
+            ("Special Pay", 'special_pay'),
+            ("Allowances", 'allowances'),
+            ("Monthly Total", 'total')
+        ]
+    return [
+        ("Base Pay", 'base_pay'),
+        ("BAH", 'bah'),
+        ("BAS", 'bas'),
+        ("Per Diem", 'per_diem'),
+        ("Hazard Pay", 'hazard_pay'),
+        ("Hardship Pay", 'hardship_pay'),
+        ("Danger Pay", 'danger_pay'),
+        ("Monthly Total", 'total')
+    ]
+
+def _check_correction_inputs(is_correction, original_details, correct_pay):
+    """Correction reports compare two results, so both sides must be supplied"""
+    if is_correction and (original_details is None or correct_pay is None):
+        raise ValueError("Correction reports need original_details and correct_pay")
+
+def report_filename(extension):
+    """Return a default, collision-free file name for a report"""
+    return f"pay_report_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.{extension}"
+
+def _report_buffer(output):
+    """Return the stream a report is rendered into: the caller's file-like object or a new buffer"""
+    return output if hasattr(output, 'write') else io.BytesIO()
+
+def _finish_report(buffer, output):
+    """Return the report bytes (writing them to output when it is a path), or the caller's file-like object"""
+    if buffer is output:
+        return output
+    if output is not None:
+        with open(output, 'wb') as f:
+            f.write(buffer.getbuffer())
+    return buffer.getvalue()
+
+@METRICS.timed('report.pdf', profile=True)
 def generate_pdf_report(pay_info, service_category, military_grade, years_of_service, start_date, end_date, 
                        has_dependents, hazardous_duty, hardship_duty, at_border,
                        sm_name, sm_dodid, sm_task_force, sm_company,
-                       is_correction=False, original_details=None):
-    """Generate a PDF report of the pay calculation"""
-    print("Debug: Starting PDF report generation...")
-    print(f"Debug: Is correction report: {is_correction}")
-    print(f"Debug: Pay info keys: {pay_info.keys() if pay_info else 'No pay info'}")
+                       is_correction=False, original_details=None, output=None, correct_pay=None):
+    """Generate a PDF report of the pay calculation.
+
+    For correction reports pay_info is the original pay and correct_pay the
+    corrected pay result. Returns the PDF as bytes, also writing it to disk
+    when output is a path; a file-like output is streamed into and returned.
+    """
+    _check_correction_inputs(is_correction, original_details, correct_pay)
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+
+    logger.debug("Generating %s PDF report", "correction" if is_correction else "pay")
 
     try:
-        filename = f"pay_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        doc = SimpleDocTemplate(filename, pagesize=letter)
+        buffer = _report_buffer(output)
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
 
         def onFirstPage(canvas, doc):
             add_header_logo(canvas, doc)
@@ -103,7 +220,6 @@ def generate_pdf_report(pay_info, service_category, military_grade, years_of_ser
         elements.append(Paragraph("SAD Pay Correction Report" if is_correction else "SAD Pay Calculator Report", title_style))
         elements.append(Spacer(1, 12))
 
-        print("Debug: Basic report structure created...")
 
         # Service Member Information
         if any([sm_name, sm_dodid, sm_task_force, sm_company]):
@@ -122,10 +238,8 @@ def generate_pdf_report(pay_info, service_category, military_grade, years_of_ser
                     elements.append(Paragraph(detail, sm_style))
             elements.append(Spacer(1, 12))
 
-        print("Debug: Service member information added...")
 
         if is_correction:
-            print("Debug: Processing correction report details...")
             # Add original pay details
             elements.append(Paragraph("Original Pay Details", styles['Heading2']))
 
@@ -154,7 +268,6 @@ def generate_pdf_report(pay_info, service_category, military_grade, years_of_ser
 
             elements.append(Paragraph("Correct Pay Details", styles['Heading2']))
 
-        print("Debug: Adding basic information...")
         # Basic Information
         info_style = ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=12, spaceAfter=6)
 
@@ -180,22 +293,20 @@ def generate_pdf_report(pay_info, service_category, military_grade, years_of_ser
             elements.append(Paragraph(info, info_style))
         elements.append(Spacer(1, 20))
 
-        print("Debug: Processing pay comparison...")
         if is_correction:
             # Display comparison
             elements.append(Paragraph("Pay Comparison", styles['Heading2']))
             
-            # Calculate the difference between correct and original pay
-            correct_pay = st.session_state.correct_pay['grand_total']
-            original_pay = pay_info['grand_total']
-            difference = correct_pay - original_pay
-            
+            # Compare correct against original pay
+            pay_diff = diff_pay(pay_info, correct_pay)
+            difference = pay_diff.difference
+
             diff_text = f"{format_currency(abs(difference))} ({'(+)' if difference > 0 else '(-)'})"
             compare_data = [
                 ["Component", "Original", "Correct", "Difference"],
                 ["Total Pay", 
-                 format_currency(original_pay),
-                 format_currency(correct_pay),
+                 format_currency(pay_diff.original_total),
+                 format_currency(pay_diff.correct_total),
                  diff_text]
             ]
 
@@ -210,88 +321,42 @@ def generate_pdf_report(pay_info, service_category, military_grade, years_of_ser
             elements.append(table)
             elements.append(Spacer(1, 20))
 
-            print("Debug: Processing monthly breakdown...")
             # Monthly breakdown comparison
             elements.append(Paragraph("Monthly Breakdown Comparison", styles['Heading2']))
 
-            # In the correction report, original pay info is in pay_info (passed parameter)
-            # and correct pay info is in st.session_state.correct_pay
-            # So we need to restructure how we access the monthly breakdown
-            if 'monthly_breakdown' in pay_info:
-                original_monthly_breakdown = pay_info['monthly_breakdown']
-                correct_monthly_breakdown = st.session_state.correct_pay['monthly_breakdown']
-                
-                # Get all unique months from both breakdowns
-                all_months = set(original_monthly_breakdown.keys()).union(
-                    set(correct_monthly_breakdown.keys())
-                )
-                
-                for month in sorted(all_months):
-                    elements.append(Paragraph(f"\n{month}", styles['Heading3']))
-                    
-                    orig_month = original_monthly_breakdown.get(month, {})
-                    corr_month = correct_monthly_breakdown.get(month, {})
-
-                    month_data = [["Component", "Original", "Correct", "Difference"]]
-
-                    if service_category == ServiceCategory.TEXAS_SG:
-                        components = [
-                            ("Base Pay", 'base_pay'),
-                            ("Special Pay", 'special_pay'),
-                            ("Allowances", 'allowances'),
-                            ("Monthly Total", 'total')
-                        ]
-                    else:
-                        components = [
-                            ("Base Pay", 'base_pay'),
-                            ("BAH", 'bah'),
-                            ("BAS", 'bas'),
-                            ("Per Diem", 'per_diem')  # Add Per Diem component
-                        ]
-
-                        # Add special duty components only if they exist
-                        if any(key in orig_month or key in corr_month for key in ['hazard_pay', 'hardship_pay', 'danger_pay']):
-                            components.extend([
-                                ("Hazard Pay", 'hazard_pay'),
-                                ("Hardship Pay", 'hardship_pay'),
-                                ("Danger Pay", 'danger_pay')
-                            ])
-
-                        components.append(("Monthly Total", 'total'))
-
-                    for component, key in components:
-                        orig_value = orig_month.get(key, 0)
-                        corr_value = corr_month.get(key, 0)
-                        diff_value = corr_value - orig_value
-
-                        month_data.append([
-                            component,
-                            format_currency(orig_value),
-                            format_currency(corr_value),
-                            format_currency(diff_value)
-                        ])
-
-                    table = Table(month_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-                    table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey)
-                    ]))
-                    elements.append(table)
-                    elements.append(Spacer(1, 12))
-
-        print("Debug: Adding final summary...")
+            # Months of both results, paired in chronological order
+            components = get_breakdown_components(service_category)
+            for month_diff in pay_diff.months:
+                elements.append(Paragraph(f"\n{month_diff.key}", styles['Heading3']))
+
+                month_data = [["Component", "Original", "Correct", "Difference"]]
+
+                for component, key in components:
+                    month_data.append([
+                        component,
+                        format_currency(getattr(month_diff.original, key)),
+                        format_currency(getattr(month_diff.correct, key)),
+                        format_currency(month_diff.delta(key))
+                    ])
+
+                table = Table(month_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
+                table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                    ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey)
+                ]))
+                elements.append(table)
+                elements.append(Spacer(1, 12))
+
         # Grand Total
         elements.append(Spacer(1, 20))
         if is_correction:
-            # Calculate the difference for the grand total section
-            correct_pay = st.session_state.correct_pay['grand_total']
-            original_pay = pay_info['grand_total']
-            difference = correct_pay - original_pay
-            
+            # Difference for the grand total section
+            difference = pay_diff.difference
+
             difference_text = format_currency(abs(difference))
             status_text = "(Underpayment)" if difference > 0 else "(Overpayment)"
             total_text = f"Total Difference: {difference_text} {status_text}"
@@ -307,63 +372,135 @@ def generate_pdf_report(pay_info, service_category, military_grade, years_of_ser
                 ParagraphStyle('Total', parent=styles['Heading2'], textColor=colors.green)
             ))
 
-        print("Debug: Building final PDF...")
-        doc.build(elements, onFirstPage=onFirstPage, onLaterPages=onLaterPages)
-        print("Debug: PDF report generated successfully")
-        return filename
-    except Exception as e:
-        print(f"Debug: Error in PDF generation - {str(e)}")
+        with METRICS.timer('report.pdf.build'):
+            doc.build(elements, onFirstPage=onFirstPage, onLaterPages=onLaterPages)
+        return _finish_report(buffer, output)
+    except Exception:
+        logger.exception("PDF report generation failed")
         raise
 
+class StreamingSheet:
+    """Sequential row writer for an openpyxl write-only worksheet.
+
+    Write-only sheets emit column widths before the first row, so widths are
+    fixed up front and every row is written as soon as it is appended; memory
+    stays flat however many rows the sheet gets.
+    """
+
+    def __init__(self, ws, widths=None):
+        self.ws = ws
+        self._overlays = {}
+        self.rows_written = 0
+        for column, width in (widths or {}).items():
+            ws.column_dimensions[column].width = width
+
+    def append(self, values=(), style=None):
+        """Write the next row.
+
+        style names an entry of excel_styles() applied to every non-empty cell, or
+        is a sequence giving one style name (or None) per cell.
+        """
+        self.rows_written += 1
+        if isinstance(style, (list, tuple)):
+            styles = list(style) + [None] * (len(values) - len(style))
+        else:
+            styles = [style] * len(values)
+        row = [self._cell(value, cell_style if value is not None else None)
+               for value, cell_style in zip(values, styles)]
+        for column, (value, overlay_style) in self._overlays.pop(self.rows_written, {}).items():
+            row.extend([None] * (column - len(row)))
+            row[column - 1] = self._cell(value, overlay_style)
+        self.ws.append(row)
+
+    def merge_cells(self, range_string):
+        """Merge a cell range"""
+        self.ws.merged_cells.add(range_string)
+
+    def overlay(self, row, column, value, style=None):
+        """Place a cell over whatever row `row` holds; it must not be written yet"""
+        self._overlays.setdefault(row, {})[column] = (value, style)
+
+    def _cell(self, value, style):
+        if style is None:
+            return value
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(self.ws, value=value)
+        for attribute, setting in excel_styles()[style].items():
+            setattr(cell, attribute, setting)
+        return cell
+
+    def close(self):
+        """Write any overlays that fall past the last row"""
+        while self._overlays:
+            self.append()
+
+@lru_cache(maxsize=None)
+def excel_styles():
+    """Named cell styles shared by the streamed Excel reports, built on first use"""
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    return {
+        'title': {'font': Font(size=16, bold=True)},
+        'bold': {'font': Font(bold=True)},
+        'header': {'font': Font(color='FFFFFF', bold=True),
+                   'fill': PatternFill(start_color='366092', end_color='366092', fill_type='solid')},
+        'grand_total': {'font': Font(bold=True, size=12)},
+        'currency': {'number_format': '"$"#,##0.00'},
+        'total_currency': {'font': Font(bold=True), 'number_format': '"$"#,##0.00'},
+        'date': {'number_format': 'yyyy-mm-dd'},
+        'watermark': {'font': Font(name='Calibri', bold=True, color='D3D3D3', size=36),  # Light gray color
+                      'alignment': Alignment(horizontal='center', vertical='center', textRotation=45)},  # Diagonal text
+    }
+
+# Column widths of the single-member Excel report: labels, then the original,
+# correct and difference amounts (B also holds names and date ranges)
+EXCEL_REPORT_WIDTHS = {'A': 30, 'B': 42, 'C': 16, 'D': 20}
+
+@METRICS.timed('report.excel', profile=True)
 def generate_excel_report(pay_info, service_category, military_grade, years_of_service, start_date, end_date, 
                          has_dependents, hazardous_duty, hardship_duty, at_border,
                          sm_name, sm_dodid, sm_task_force, sm_company,
-                         is_correction=False, original_details=None):
-    """Generate an Excel report of the pay calculation"""
-    filename = f"pay_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Pay Calculation Report"
-
-    # Styles
-    header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-    header_font = Font(color='FFFFFF', bold=True)
-    total_font = Font(bold=True)
+                         is_correction=False, original_details=None, output=None, correct_pay=None):
+    """Generate an Excel report of the pay calculation.
 
-    # Title
-    ws.cell(row=1, column=1, value="SAD Pay Correction Report" if is_correction else "SAD Pay Calculator Report")
-    ws.cell(row=1, column=1).font = Font(size=16, bold=True)
-    ws.merge_cells('A1:D1')
+    For correction reports pay_info is the original pay and correct_pay the
+    corrected pay result. Returns the workbook as bytes, also writing it to
+    disk when output is a path; a file-like output is streamed into and returned.
+    """
+    _check_correction_inputs(is_correction, original_details, correct_pay)
+    import openpyxl
 
-    # Basic Information
-    current_row = 3
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Pay Calculation Report")
+    sheet = StreamingSheet(ws, widths=EXCEL_REPORT_WIDTHS)
+    # Add "NOT FOR OFFICIAL USE" watermark as large, semi-transparent text
+    # Using a single large cell with formatted text as the watermark, placed
+    # in the middle of the sheet; it is registered before row 15 is streamed out
+    sheet.overlay(15, 3, "NOT FOR OFFICIAL USE", style='watermark')
+
+    # Title
+    sheet.append(["SAD Pay Correction Report" if is_correction else "SAD Pay Calculator Report"], style='title')
+    sheet.merge_cells('A1:D1')
+    sheet.append()
 
     # Service Member Information
     if sm_name or sm_dodid or sm_task_force or sm_company:
-        ws.cell(row=current_row, column=1, value="Service Member Information").font = Font(bold=True)
-        current_row += 1
+        sheet.append(["Service Member Information"], style='bold')
 
         if sm_name:
-            ws.cell(row=current_row, column=1, value="Name:")
-            ws.cell(row=current_row, column=2, value=sm_name)
-            current_row += 1
+            sheet.append(["Name:", sm_name])
         if sm_dodid:
-            ws.cell(row=current_row, column=1, value="DOD ID:")
-            ws.cell(row=current_row, column=2, value=sm_dodid)
-            current_row += 1
+            sheet.append(["DOD ID:", sm_dodid])
         if sm_task_force:
-            ws.cell(row=current_row, column=1, value="Task Force:")
-            ws.cell(row=current_row, column=2, value=sm_task_force)
-            current_row += 1
+            sheet.append(["Task Force:", sm_task_force])
         if sm_company:
-            ws.cell(row=current_row, column=1, value="Company:")
-            ws.cell(row=current_row, column=2, value=sm_company)
-            current_row += 2
+            sheet.append(["Company:", sm_company])
+            sheet.append()
 
     if is_correction:
         # Add original details
-        ws.cell(row=current_row, column=1, value="Original Pay Details").font = Font(bold=True)
-        current_row += 1
+        sheet.append(["Original Pay Details"], style='bold')
 
         present = original_details.get('present_this_month', False)
         orig_info = [
@@ -379,13 +516,10 @@ def generate_excel_report(pay_info, service_category, military_grade, years_of_s
         ]
 
         for info in orig_info:
-            ws.cell(row=current_row, column=1, value=info[0])
-            ws.cell(row=current_row, column=2, value=info[1])
-            current_row += 1
+            sheet.append(info)
 
-        current_row += 1
-        ws.cell(row=current_row, column=1, value="Correct Pay Details").font = Font(bold=True)
-        current_row += 1
+        sheet.append()
+        sheet.append(["Correct Pay Details"], style='bold')
 
     basic_info = [
         ["Service Category:", service_category.value],
@@ -399,164 +533,166 @@ def generate_excel_report(pay_info, service_category, military_grade, years_of_s
     ]
 
     for info in basic_info:
-        ws.cell(row=current_row, column=1, value=info[0])
-        ws.cell(row=current_row, column=2, value=info[1])
-        current_row += 1
+        sheet.append(info)
 
     if is_correction:
         # Add pay comparison section
-        current_row += 2
-        ws.cell(row=current_row, column=1, value="Pay Comparison").font = Font(bold=True)
-        current_row += 1
+        sheet.append()
+        sheet.append()
+        sheet.append(["Pay Comparison"], style='bold')
 
-        # Headers
         headers = ["Component", "Original", "Correct", "Difference"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=current_row, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-        current_row += 1
+        sheet.append(headers, style='header')
 
         # Total comparison
-        correct_pay = st.session_state.correct_pay['grand_total']
-        original_pay = pay_info['grand_total']
-        difference = correct_pay - original_pay
-        
-        ws.cell(row=current_row, column=1, value="Total Pay")
-        ws.cell(row=current_row, column=2, value=format_currency(original_pay))
-        ws.cell(row=current_row, column=3, value=format_currency(correct_pay))
-        ws.cell(row=current_row, column=4, value=format_currency(abs(difference)) +
-                (" (+)" if difference > 0 else " (-)"))
+        pay_diff = diff_pay(pay_info, correct_pay)
+        difference = pay_diff.difference
+
+        sheet.append([
+            "Total Pay",
+            format_currency(pay_diff.original_total),
+            format_currency(pay_diff.correct_total),
+            format_currency(abs(difference)) + (" (+)" if difference > 0 else " (-)")
+        ])
 
         # Monthly breakdown comparison
-        current_row += 2
-        ws.cell(row=current_row, column=1, value="Monthly Breakdown Comparison").font = Font(bold=True)
-        current_row += 1
-
-        # Similar approach to PDF generation - restructuring how we access monthly breakdown
-        original_monthly_breakdown = pay_info['monthly_breakdown']
-        correct_monthly_breakdown = st.session_state.correct_pay['monthly_breakdown']
-        
-        # Get all unique months from both breakdowns
-        all_months = set(original_monthly_breakdown.keys()).union(
-            set(correct_monthly_breakdown.keys())
-        )
-        
-        for month in sorted(all_months):
-            orig_month = original_monthly_breakdown.get(month, {})
-            corr_month = correct_monthly_breakdown.get(month, {})
-
-            ws.cell(row=current_row, column=1, value=month).font = Font(bold=True)
-            current_row += 1
-
-            # Headers
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.fill = header_fill
-                cell.font = header_font
-            current_row += 1
-
-            # Data rows
-            if service_category == ServiceCategory.TEXAS_SG:
-                components = [
-                    ("Base Pay", 'base_pay'),
-                    ("Special Pay", 'special_pay'),
-                    ("Allowances", 'allowances'),
-                    ("Monthly Total", 'total')
-                ]
-            else:
-                components = [
-                    ("Base Pay", 'base_pay'),
-                    ("BAH", 'bah'),
-                    ("BAS", 'bas'),
-                    ("Per Diem", 'per_diem') #Add Per Diem component
-                ]
-
-                # Add special duty components only if they exist
-                if any(key in orig_month or key in corr_month for key in ['hazard_pay', 'hardship_pay', 'danger_pay']):
-                    components.extend([
-                        ("Hazard Pay", 'hazard_pay'),
-                        ("Hardship Pay", 'hardship_pay'),
-                        ("Danger Pay", 'danger_pay')
-                    ])
+        sheet.append()
+        sheet.append(["Monthly Breakdown Comparison"], style='bold')
 
-                components.append(("Monthly Total", 'total'))
+        # Pair original and correct months in chronological order
+        components = get_breakdown_components(service_category)
+        for month_diff in pay_diff.months:
+            sheet.append([month_diff.key], style='bold')
+            sheet.append(headers, style='header')
 
             for label, key in components:
-                orig_value = orig_month.get(key, 0)
-                corr_value = corr_month.get(key, 0)
-                diff_value = corr_value - orig_value
-
-                ws.cell(row=current_row, column=1, value=label)
-                ws.cell(row=current_row, column=2, value=format_currency(orig_value))
-                ws.cell(row=current_row, column=3, value=format_currency(corr_value))
-                ws.cell(row=current_row, column=4, value=format_currency(diff_value))
-
-                if label == "Monthly Total":
-                    for col in range(1, 5):
-                        ws.cell(row=current_row, column=col).font = total_font
-
-                current_row += 1
+                sheet.append([
+                    label,
+                    format_currency(getattr(month_diff.original, key)),
+                    format_currency(getattr(month_diff.correct, key)),
+                    format_currency(month_diff.delta(key))
+                ], style='bold' if label == "Monthly Total" else None)
 
-            current_row += 1
+            sheet.append()
 
     # Grand Total
-    current_row += 1
+    sheet.append()
     if is_correction:
-        # Calculate the final difference for Grand Total
-        correct_pay = st.session_state.correct_pay['grand_total']
-        original_pay = pay_info['grand_total']
-        difference = correct_pay - original_pay
-        
+        # Final difference for Grand Total
+        difference = pay_diff.difference
+
         difference_text = format_currency(abs(difference))
         status_text = "(Underpayment)" if difference > 0 else "(Overpayment)"
-        ws.cell(row=current_row, column=1, value="Total Difference:")
-        ws.cell(row=current_row, column=2, value=f"{difference_text} {status_text}")
+        sheet.append(["Total Difference:", f"{difference_text} {status_text}"], style='grand_total')
     else:
-        ws.cell(row=current_row, column=1, value=f"Grand Total for {pay_info['total_days']} days:")
-        ws.cell(row=current_row, column=2, value=format_currency(pay_info['grand_total']))
-
-    ws.cell(row=current_row, column=1).font = Font(bold=True, size=12)
-    ws.cell(row=current_row, column=2).font = Font(bold=True, size=12)
+        sheet.append([f"Grand Total for {pay_info['total_days']} days:", format_currency(pay_info['grand_total'])],
+                     style='grand_total')
 
     # Add logo to excel
     try:
-        img = PILImage.open('attached_assets/NEW LOGO SMALL.png')
-        # Resize image for Excel
-        desired_width = 200
-        ratio = desired_width / float(img.size[0])
-        desired_height = int(float(img.size[1]) * ratio)
-        img = img.resize((desired_width, desired_height), PILImage.Resampling.LANCZOS)
-
-        # Save resized image
-        img_path = 'attached_assets/excel_logo_temp.png'
-        img.save(img_path)
-
-        # Add to Excel
-        logo = XLImage(img_path)
-        ws.add_image(logo, 'E3')
+        ws.add_image(get_excel_logo(), 'E3')
     except Exception as e:
-        print(f"Could not add logo to Excel: {str(e)}")
-
-    # Adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        for cell in col:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[openpyxl.utils.get_column_letter(col[0].column)].width = adjusted_width
-
-    # Add "NOT FOR OFFICIAL USE" watermark as large, semi-transparent text
-    # Using a single large cell with formatted text as the watermark
-    watermark_row = 15  # Position in the middle of the sheet
-    watermark_col = 3   # Position in the middle columns
-    ws.cell(row=watermark_row, column=watermark_col).value = "NOT FOR OFFICIAL USE"
-    ws.cell(row=watermark_row, column=watermark_col).font = Font(name='Calibri', bold=True, color='D3D3D3', size=36)  # Light gray color
-    ws.cell(row=watermark_row, column=watermark_col).alignment = Alignment(horizontal='center', vertical='center', textRotation=45)  # Diagonal text
-
-    wb.save(filename)
-    return filename
\ No newline at end of file
+        logger.warning("Could not add logo to Excel: %s", e)
+
+    sheet.close()
+
+    buffer = _report_buffer(output)
+    with METRICS.timer('report.excel.save'):
+        wb.save(buffer)
+    return _finish_report(buffer, output)
+
+
+# Columns of the consolidated roster workbook: (header, width, style)
+ROSTER_SUMMARY_COLUMNS = [
+    ("Row", 6, None), ("Name", 28, None), ("DOD ID", 14, None), ("Task Force", 18, None),
+    ("Company", 16, None), ("Service Category", 22, None), ("Grade", 8, None),
+    ("Start Date", 12, 'date'), ("End Date", 12, 'date'), ("Days", 8, None), ("Grand Total", 16, 'currency')
+]
+ROSTER_MONTH_COLUMNS = [
+    ("Row", 6, None), ("Name", 28, None), ("DOD ID", 14, None), ("Task Force", 18, None),
+    ("Service Category", 22, None), ("Grade", 8, None), ("Year", 6, None), ("Month", 6, None),
+    ("Pay Period", 16, None), ("Days", 6, None), ("Base Pay", 13, 'currency'), ("BAH", 12, 'currency'),
+    ("BAS", 12, 'currency'), ("Per Diem", 12, 'currency'), ("Min Income Adj", 14, 'currency'),
+    ("Hazard Pay", 12, 'currency'), ("Hardship Pay", 13, 'currency'), ("Danger Pay", 12, 'currency'),
+    ("Special Pay", 12, 'currency'), ("Allowances", 12, 'currency'), ("Monthly Total", 14, 'currency')
+]
+ROSTER_MONTH_FIELDS = ['days', 'base_pay', 'bah', 'bas', 'per_diem', 'minimum_income_adjustment', 'hazard_pay',
+                       'hardship_pay', 'danger_pay', 'special_pay', 'allowances', 'total']
+
+def _roster_sheet(wb, title, columns):
+    """Create a write-only sheet with fixed column widths, a styled header row and a frozen header"""
+    from openpyxl.utils.cell import get_column_letter
+
+    ws = wb.create_sheet(title)
+    ws.freeze_panes = 'A2'
+    sheet = StreamingSheet(ws, widths={get_column_letter(i): width for i, (_, width, _) in enumerate(columns, 1)})
+    sheet.append([header for header, _, _ in columns], style='header')
+    return sheet
+
+def _member_text(members, member, column):
+    """Read an optional roster text column, returning '' when it is missing or blank"""
+    if members is None or column not in members:
+        return ''
+    value = members.at[member, column]
+    return '' if value is None or value != value else str(value)
+
+@METRICS.timed('report.roster', profile=True)
+def generate_roster_workbook(breakdown, members=None, output=None):
+    """Generate one workbook for a whole roster from calculate_total_pay_batch results.
+
+    Writes a Summary sheet (one row per member with the grand total) and a
+    filterable Monthly Pay sheet (one row per member per month), with amounts
+    stored as numeric cells in currency format. members is the roster the
+    breakdown was calculated from (indexed from 0, as read_roster gives it) and
+    supplies names, DOD IDs, task force and dates. Returns bytes, or writes to
+    output like generate_excel_report.
+    """
+    import openpyxl
+    from openpyxl.utils.cell import get_column_letter
+
+    wb = openpyxl.Workbook(write_only=True)
+    summary = _roster_sheet(wb, "Summary", ROSTER_SUMMARY_COLUMNS)
+    monthly = _roster_sheet(wb, "Monthly Pay", ROSTER_MONTH_COLUMNS)
+    summary_styles = [style for _, _, style in ROSTER_SUMMARY_COLUMNS]
+    month_styles = [style for _, _, style in ROSTER_MONTH_COLUMNS]
+
+    # Member order follows the breakdown. Row is the roster index plus one, the
+    # same number manifest.csv and the per-member statement files use, so it
+    # does not restart in per-task-force workbooks
+    grand_totals = breakdown.groupby('member', sort=False).agg(
+        total_days=('days', 'sum'), grand_total=('total', 'sum'),
+        service_category=('service_category', 'first'), grade=('grade', 'first'))
+
+    for member, totals in grand_totals.iterrows():
+        start = members.at[member, 'start_date'] if members is not None else None
+        end = members.at[member, 'end_date'] if members is not None else None
+        summary.append([
+            int(member) + 1, _member_text(members, member, 'sm_name'), _member_text(members, member, 'sm_dodid'),
+            _member_text(members, member, 'sm_task_force'), _member_text(members, member, 'sm_company'),
+            totals['service_category'], totals['grade'], start, end, int(totals['total_days']),
+            round(float(totals['grand_total']), 2)
+        ], style=summary_styles)
+
+    summary.append()
+    summary.append(["Total"] + [None] * 9 + [round(float(grand_totals['grand_total'].sum()), 2)],
+                   style=['bold'] + [None] * 9 + ['total_currency'])
+
+    # One pass over the long breakdown for the data sheet
+    columns = ['member', 'service_category', 'grade', 'year', 'month', 'month_key'] + ROSTER_MONTH_FIELDS
+    for values in breakdown[columns].itertuples(index=False, name=None):
+        member, category, grade, year, month, month_key = values[:6]
+        amounts = values[6:]
+        monthly.append([
+            int(member) + 1, _member_text(members, member, 'sm_name'),
+            _member_text(members, member, 'sm_dodid'), _member_text(members, member, 'sm_task_force'),
+            category, grade, int(year), int(month), month_key, int(amounts[0])
+        ] + [float(amount) for amount in amounts[1:]], style=month_styles)
+
+    monthly.ws.auto_filter.ref = f"A1:{get_column_letter(len(ROSTER_MONTH_COLUMNS))}{monthly.rows_written}"
+    summary.close()
+    monthly.close()
+
+    buffer = _report_buffer(output)
+    with METRICS.timer('report.roster.save'):
+        wb.save(buffer)
+    return _finish_report(buffer, output)
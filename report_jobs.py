@@ -0,0 +1,168 @@
+"""Background report generation so the UI never waits on ReportLab/openpyxl.
+
+    job_id = REPORT_JOBS.submit(generate_pdf_report, *args, key=inputs_key, owner=session_id,
+                                stage='report.pdf', profile=True)
+    job = REPORT_JOBS.get(job_id)   # job.status, job.progress, job.result, job.error
+
+At most max_workers reports are built at once; further jobs wait in the
+queue. Finished jobs (and their bytes) are dropped ttl seconds after they
+finish; until then, submitting the same key again returns the existing job
+instead of building the report twice. Jobs run on threads so they share the process's pay and asset caches
+and hand back their bytes without pickling. REPORT_JOB_WORKERS,
+REPORT_JOB_TTL and REPORT_JOBS_PER_OWNER configure the shared REPORT_JOBS queue.
+"""
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+from instrumentation import METRICS
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+class JobLimitError(RuntimeError):
+    """Raised when an owner already has the maximum number of unfinished jobs"""
+
+class ReportJob:
+    """Status and result of one submitted report"""
+
+    def __init__(self, job_id, key, owner, stage, profile=None):
+        self.id = job_id
+        self.key = key
+        self.owner = owner
+        self.stage = stage
+        self.profile = profile
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = monotonic()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    @property
+    def active(self):
+        """True while the job is queued or running"""
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def progress(self):
+        """Fraction done, estimated from the average time of earlier runs of the same stage"""
+        if not self.active:
+            return 1.0
+        if self.status == QUEUED:
+            return 0.0
+        timer = METRICS.snapshot()['timers'].get(self.stage) if self.stage else None
+        if not timer:
+            return 0.5
+        return min((monotonic() - self.started) / timer['mean'], 0.95)
+
+class ReportJobQueue:
+    """Thread pool that runs report jobs with a concurrency limit and keeps results for ttl seconds"""
+
+    def __init__(self, max_workers=2, ttl=15 * 60, max_active_per_owner=2):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.max_active_per_owner = max_active_per_owner
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        self._jobs = {}
+        self._keys = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args, key=None, owner=None, stage=None, profile=None, **kwargs):
+        """Queue function(*args, **kwargs) and return the job id.
+
+        `key` identifies the inputs: while a queued, running or finished job
+        with the same key is kept, its id is returned instead. `stage` names
+        the METRICS timer the function records (e.g. 'report.pdf'), which is
+        used to estimate progress. `profile` turns METRICS profiling on or
+        off for this job alone (None keeps the process-wide setting); its
+        profiles are tagged with `owner`.
+        """
+        with self._lock:
+            self._evict_expired()
+            existing = self._jobs.get(self._keys.get(key)) if key is not None else None
+            if existing is not None and existing.status not in (FAILED, CANCELLED):
+                METRICS.count('report_jobs.reused')
+                return existing.id
+            if owner is not None and self.max_active_per_owner is not None:
+                active = sum(1 for job in self._jobs.values() if job.owner == owner and job.active)
+                if active >= self.max_active_per_owner:
+                    raise JobLimitError(f"{active} report(s) are already being generated; "
+                                        f"wait for one to finish")
+            job = ReportJob(f'job-{next(self._ids)}', key, owner, stage, profile)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._keys[key] = job.id
+        METRICS.count('report_jobs.submitted')
+        job.future = self._executor.submit(self._run, job, function, args, kwargs)
+        return job.id
+
+    def _run(self, job, function, args, kwargs):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started = monotonic()
+        METRICS.record('report_jobs.wait', job.started - job.submitted)
+        try:
+            with METRICS.request_profiling(enabled=job.profile, owner=job.owner):
+                result = function(*args, **kwargs)
+        except Exception as e:
+            METRICS.count('report_jobs.failed')
+            with self._lock:
+                job.status, job.error, job.finished = FAILED, e, monotonic()
+        else:
+            with self._lock:
+                job.status, job.result, job.finished = DONE, result, monotonic()
+
+    def get(self, job_id):
+        """Return the job, or None if it is unknown or has expired"""
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet; returns True if it was cancelled"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            job.status = CANCELLED
+            job.finished = monotonic()
+        job.future.cancel()
+        return True
+
+    def _evict_expired(self):
+        """Drop finished jobs older than ttl (caller holds the lock)"""
+        cutoff = monotonic() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished is not None and job.finished < cutoff]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._keys.get(job.key) == job_id:
+                del self._keys[job.key]
+
+    def stats(self):
+        """Return queued, running and finished job counts"""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {'max_workers': self.max_workers, 'queued': statuses.count(QUEUED),
+                'running': statuses.count(RUNNING),
+                'finished': len(statuses) - statuses.count(QUEUED) - statuses.count(RUNNING)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+REPORT_JOBS = ReportJobQueue(
+    max_workers=int(os.environ.get('REPORT_JOB_WORKERS', 2)),
+    ttl=float(os.environ.get('REPORT_JOB_TTL', 15 * 60)),
+    max_active_per_owner=int(os.environ.get('REPORT_JOBS_PER_OWNER', 2)),
+)
+METRICS.add_source('report_jobs', REPORT_JOBS.stats)
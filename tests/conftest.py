@@ -0,0 +1,20 @@
+import glob
+import os
+
+import pytest
+
+from utils import RATE_TABLE_DIR, RateTable, clear_pay_cache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Run every test against an empty PAY_CACHE"""
+    clear_pay_cache()
+    yield
+    clear_pay_cache()
+
+@pytest.fixture
+def load_rate_table():
+    """Loader returning a fresh copy of the first rate table that a test may modify"""
+    def load():
+        return RateTable.from_json(sorted(glob.glob(os.path.join(RATE_TABLE_DIR, 'rates_*.json')))[0])
+    return load
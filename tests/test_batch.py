@@ -0,0 +1,38 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from batch_pay import calculate_total_pay_batch, roster_errors
+from utils import ServiceCategory, calculate_total_pay
+
+def _roster(**overrides):
+    members = pd.DataFrame({
+        'service_category': ['AIR_NG', 'TEXAS_SG'],
+        'grade': ['E-5', None],
+        'years_of_service': [4, None],
+        'start_date': [date(2024, 1, 1)] * 2,
+        'end_date': [date(2024, 2, 15)] * 2,
+    })
+    for column, value in overrides.items():
+        members.loc[0, column] = value
+    return members
+
+def test_texas_sg_rows_may_leave_grade_and_years_blank():
+    assert roster_errors(_roster()).isna().all()
+    breakdown = calculate_total_pay_batch(_roster())
+    texas = calculate_total_pay(ServiceCategory.TEXAS_SG, None, None, date(2024, 1, 1), date(2024, 2, 15))
+    assert list(breakdown[breakdown['member'] == 1]['total']) == \
+        [month['total'] for month in texas['monthly_breakdown'].values()]
+
+@pytest.mark.parametrize('column', ['grade', 'years_of_service', 'start_date', 'end_date'])
+def test_rows_with_blank_required_inputs_are_rejected(column):
+    members = _roster(**{column: None})
+    with pytest.raises(ValueError) as engine_error:
+        calculate_total_pay(ServiceCategory.AIR_NG, *members.loc[0, ['grade', 'years_of_service', 'start_date',
+                                                                      'end_date']])
+    errors = roster_errors(members)
+    assert errors[0] == str(engine_error.value)
+    assert pd.isna(errors[1])
+    with pytest.raises(ValueError, match=column):
+        calculate_total_pay_batch(members)
@@ -0,0 +1,48 @@
+import sys
+import threading
+import tracemalloc
+
+from instrumentation import Metrics
+
+def test_profiles_are_kept_per_request_owner():
+    metrics = Metrics()
+    with metrics.request_profiling(enabled=True, owner='a'):
+        with metrics.profile('report'):
+            pass
+    with metrics.profile('report'):
+        pass
+    assert not metrics.profiling
+    assert [profile['owner'] for profile in metrics.profiles] == ['a']
+    assert metrics.profiles_for('b') == []
+    assert metrics.snapshot(include_profiles=True, owner='b')['profiles'] == []
+
+def test_overlapping_profiles():
+    metrics = Metrics()
+    first_done = threading.Event()
+    second_started = threading.Event()
+    tracing = []
+
+    def second():
+        with metrics.profile('second', enabled=True):
+            second_started.set()
+            first_done.wait()
+            data = [bytearray(1024) for _ in range(1000)]
+            tracing.append(tracemalloc.is_tracing())
+            del data
+
+    with metrics.profile('first', enabled=True):
+        thread = threading.Thread(target=second)
+        thread.start()
+        second_started.wait()
+    first_done.set()
+    thread.join()
+
+    profiles = {profile['name']: profile for profile in metrics.profiles}
+    if sys.version_info >= (3, 12):
+        # One cProfile profiler per process: the overlapping block is recorded as skipped
+        assert 'skipped' in profiles['second']
+        assert metrics.snapshot()['counters']['profile.skipped'] == 1
+    else:
+        assert tracing == [True]
+        assert profiles['second']['peak_memory_bytes'] > 1024 * 1000
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,14 @@
+from datetime import date
+
+from utils import ServiceCategory, calculate_pay_result, calculate_total_pay
+
+ORDER = (ServiceCategory.AIR_NG, 'E-5', 6, date(2024, 1, 15), date(2024, 4, 10), True)
+
+def test_callers_get_their_own_copy():
+    first = calculate_total_pay(*ORDER)
+    expected = calculate_pay_result(*ORDER).to_dict()
+    first['grand_total'] += 100
+    first['monthly_breakdown']['January 2024']['total'] = 0
+    second = calculate_total_pay(*ORDER)
+    assert second == expected
+    assert second['monthly_breakdown'] is not first['monthly_breakdown']
@@ -0,0 +1,9 @@
+from pay_service import calculate_correction
+
+def test_texas_sg_correction_deltas_add_up_to_the_difference():
+    original = {'service_category': 'TEXAS_SG', 'start_date': '2024-01-01', 'end_date': '2024-01-20'}
+    correct = dict(original, end_date='2024-01-31')
+    correction = calculate_correction(original, correct)
+    deltas = correction['months'][0]['deltas']
+    assert deltas['special_pay'] and deltas['allowances']
+    assert round(sum(value for field, value in deltas.items() if field != 'days'), 2) == correction['difference']
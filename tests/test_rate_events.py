@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from utils import RateEvent, ServiceCategory, calculate_pay_result, clear_pay_cache, promotion_event
+
+def _scale_texas_rates(table, scale):
+    table.texas_sg = {name: round(rate * scale, 2) for name, rate in table.texas_sg.items()}
+    return table
+
+def test_generator_events_are_applied():
+    order = (ServiceCategory.ARMY_NG, 'E-4', 4, date(2024, 1, 1), date(2024, 6, 30))
+    events = [promotion_event(date(2024, 3, 15), 'E-6')]
+    from_list = calculate_pay_result(*order, events=events)
+    clear_pay_cache()
+    from_generator = calculate_pay_result(*order, events=(event for event in events))
+    assert from_generator == from_list
+    assert from_generator != calculate_pay_result(*order)
+
+def test_texas_sg_follows_rate_table_events(load_rate_table):
+    start, end, change = date(2024, 1, 10), date(2024, 4, 20), date(2024, 2, 12)
+    old_table, new_table = load_rate_table(), _scale_texas_rates(load_rate_table(), 1.5)
+    events = [RateEvent(start, rate_table=old_table), RateEvent(change, rate_table=new_table)]
+    result = calculate_pay_result(ServiceCategory.TEXAS_SG, None, 0, start, end, events=events)
+
+    # Day-by-day reference
+    totals = {}
+    day = start
+    while day <= end:
+        rates = (new_table if day >= change else old_table).texas_sg
+        key = (day.year, day.month)
+        totals[key] = totals.get(key, 0) + rates['total_daily_rate']
+        day += timedelta(days=1)
+    assert [(month.year, month.month) for month in result.months] == list(totals)
+    for month in result.months:
+        assert month.total == round(totals[(month.year, month.month)], 2)
+    assert result.daily_base_rate == new_table.texas_sg['daily_base_rate']
+
+def test_texas_sg_ignores_grade_events():
+    order = (ServiceCategory.TEXAS_SG, None, 0, date(2024, 1, 1), date(2024, 3, 31))
+    plain = calculate_pay_result(*order)
+    assert calculate_pay_result(*order, events=[promotion_event(date(2024, 2, 1), 'E-6')]) is plain
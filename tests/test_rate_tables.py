@@ -0,0 +1,94 @@
+from array import array
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import utils
+from batch_pay import calculate_total_pay_batch
+from utils import (
+    ServiceCategory, calculate_pay_result, clear_pay_cache, get_rate_table, recalculate_pay_result, set_rate_table
+)
+
+RAISE = date(2025, 1, 1)
+
+@pytest.fixture(autouse=True)
+def two_tables(monkeypatch, load_rate_table):
+    """Current tables plus a copy with 5% higher pay effective RAISE"""
+    old_table, new_table = load_rate_table(), load_rate_table()
+    new_table.effective_date = RAISE
+    new_table.base_pay = array('d', (round(rate * 1.05, 2) for rate in new_table.base_pay))
+    new_table.texas_sg = {name: round(rate * 1.05, 2) for name, rate in new_table.texas_sg.items()}
+    monkeypatch.setattr(utils, 'RATE_TABLES', [old_table, new_table])
+    monkeypatch.setattr(utils, 'RATE_TABLE_DATES', [old_table.effective_date, RAISE])
+    yield old_table, new_table
+    set_rate_table(None)
+
+def _daily_reference(category, grade, years, start, end):
+    """Month totals summed day by day from the table in force on each day"""
+    totals = {}
+    day = start
+    while day <= end:
+        table = get_rate_table(day)
+        if category == ServiceCategory.TEXAS_SG:
+            rate = table.texas_sg['total_daily_rate']
+        else:
+            base = table.base_pay_rate(grade, years) + table.bah_rate(grade, False) + table.bas_rate(grade)
+            rate = max(base + table.per_diem, table.minimum_daily_rate)
+        key = (day.year, day.month)
+        totals[key] = totals.get(key, 0) + rate
+        day += timedelta(days=1)
+    return {key: round(total, 2) for key, total in totals.items()}
+
+@pytest.mark.parametrize('category, grade, years', [
+    (ServiceCategory.ARMY_NG, 'E-5', 6),
+    (ServiceCategory.TEXAS_SG, None, 0),
+])
+def test_orders_use_the_table_in_force_on_each_day(two_tables, category, grade, years):
+    start, end = date(2024, 11, 20), date(2025, 2, 10)
+    result = calculate_pay_result(category, grade, years, start, end)
+    reference = _daily_reference(category, grade, years, start, end)
+    assert {(month.year, month.month): month.total for month in result.months} == pytest.approx(reference)
+    assert result.inputs is not None
+    assert result.daily_base_rate == (two_tables[1].texas_sg['daily_base_rate'] if grade is None
+                                      else two_tables[1].base_pay_rate(grade, years))
+
+def test_order_before_the_raise_uses_the_old_table(two_tables):
+    result = calculate_pay_result(ServiceCategory.ARMY_NG, 'O-2', 3, date(2024, 3, 1), date(2024, 3, 31))
+    assert result.daily_base_rate == two_tables[0].base_pay_rate('O-2', 3)
+
+def test_cache_is_keyed_on_the_tables(two_tables):
+    order = (ServiceCategory.ARMY_NG, 'O-4', 12, date(2025, 2, 1), date(2025, 2, 28))
+    dated = calculate_pay_result(*order)
+    set_rate_table(two_tables[0])
+    pinned = calculate_pay_result(*order)
+    assert pinned.daily_base_rate == two_tables[0].base_pay_rate('O-4', 12)
+    assert pinned.grand_total < dated.grand_total
+    set_rate_table(None)
+    assert calculate_pay_result(*order) is dated
+
+def test_recalculating_across_the_raise_matches_a_full_calculation(two_tables):
+    previous = calculate_pay_result(ServiceCategory.ARMY_NG, 'E-6', 10, date(2024, 10, 1), date(2024, 12, 15))
+    extended = recalculate_pay_result(previous, end_date=date(2025, 3, 31))
+    clear_pay_cache()
+    assert extended == calculate_pay_result(*extended.inputs)
+    with pytest.raises(ValueError):
+        recalculate_pay_result(extended, effective_date=date(2025, 2, 1), grade='E-7')
+
+def test_batch_matches_the_engine_across_the_raise():
+    members = pd.DataFrame({
+        'service_category': ['ARMY_NG', 'AIR_NG', 'TEXAS_SG'],
+        'grade': ['E-3', 'O-4', None],
+        'years_of_service': [1, 14, None],
+        'start_date': [date(2024, 12, 5), date(2024, 6, 1), date(2024, 12, 31)],
+        'end_date': [date(2025, 1, 20), date(2025, 5, 31), date(2025, 1, 1)],
+        'has_dependents': [False, True, False],
+    })
+    breakdown = calculate_total_pay_batch(members)
+    for member, row in members.iterrows():
+        result = calculate_pay_result(ServiceCategory[row['service_category']], row['grade'],
+                                      row['years_of_service'] or 0, row['start_date'], row['end_date'],
+                                      row['has_dependents'])
+        rows = breakdown[breakdown['member'] == member]
+        assert list(rows['total']) == [month.total for month in result.months]
+        assert rows['daily_base_rate'].iloc[-1] == result.daily_base_rate
@@ -0,0 +1,58 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils import (
+    ServiceCategory, calculate_pay_result, calculate_total_pay, clear_pay_cache, promotion_event,
+    recalculate_pay_result
+)
+
+ORDER = (ServiceCategory.ARMY_NG, 'O-3', 8, date(2024, 1, 1), date(2024, 6, 30))
+
+def _full(inputs):
+    clear_pay_cache()
+    return calculate_pay_result(*inputs)
+
+def test_chained_recalculations_match_a_full_calculation():
+    rng = random.Random(0)
+    grades = ['E-3', 'E-5', 'E-7', 'W-2', 'O-1', 'O-3', 'O-5']
+    result = calculate_pay_result(*ORDER)
+    for _ in range(200):
+        change = rng.choice(['end_date', 'start_date', 'grade', 'years_of_service', 'has_dependents',
+                             'hazardous_duty', 'present_this_month'])
+        inputs = result.inputs
+        if change == 'end_date':
+            value = inputs.start_date + timedelta(days=rng.randint(0, 500))
+        elif change == 'start_date':
+            value = inputs.end_date - timedelta(days=rng.randint(0, 500))
+        elif change == 'grade':
+            value = rng.choice(grades)
+        elif change == 'years_of_service':
+            value = rng.randint(0, 30)
+        else:
+            value = not getattr(inputs, change)
+        result = recalculate_pay_result(result, **{change: value})
+        assert result == _full(result.inputs)
+
+def test_effective_date_result_matches_promotion_timeline():
+    previous = calculate_pay_result(*ORDER)
+    result = recalculate_pay_result(previous, effective_date=date(2024, 4, 1), grade='O-5')
+    timeline = calculate_pay_result(*ORDER, events=[promotion_event(date(2024, 4, 1), 'O-5')])
+    assert result.months == timeline.months
+    assert result.grand_total == timeline.grand_total
+
+def test_effective_date_result_cannot_be_chained_or_cached():
+    previous = calculate_pay_result(*ORDER)
+    result = recalculate_pay_result(previous, effective_date=date(2024, 4, 1), grade='O-5')
+    assert result.inputs is None
+    with pytest.raises(ValueError):
+        recalculate_pay_result(result, end_date=date(2024, 8, 31))
+    with pytest.raises(ValueError):
+        recalculate_pay_result(result, end_date=date(2024, 2, 15))
+
+    # The plain O-5 order is still priced at O-5 rates throughout
+    cached = calculate_total_pay(ServiceCategory.ARMY_NG, 'O-5', 8, date(2024, 1, 1), date(2024, 8, 31))
+    clear_pay_cache()
+    fresh = calculate_total_pay(ServiceCategory.ARMY_NG, 'O-5', 8, date(2024, 1, 1), date(2024, 8, 31))
+    assert cached == fresh
@@ -1,298 +1,287 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, date
+import glob
+import json
+import os
+import sys
+from bisect import bisect_right
+from datetime import datetime, date, timedelta
+from calendar import monthrange, month_name
 from enum import Enum
+from dataclasses import dataclass, field, replace
+from array import array
+from collections import OrderedDict, namedtuple
+import threading
+
+from instrumentation import METRICS
 
 class ServiceCategory(Enum):
     ARMY_NG = "Army National Guard"
     AIR_NG = "Air National Guard"
     TEXAS_SG = "Texas State Guard"
 
-# Texas State Guard fixed rates
-TEXAS_SG_RATES = {
-    'daily_base_rate': 173.67,
-    'special_pay': 22.00,
-    'daily_allowance': 68.00,
-    'total_daily_rate': 263.67
-}
-
-PER_DIEM_RATE = 68.00  # $68/day Per Diem rate
-MINIMUM_DAILY_RATE = 241.67  # Minimum daily rate for Army NG and Air NG
-
-def calculate_minimum_income_adjustment(daily_base_rate, daily_bah_rate, daily_bas_rate):
+def coerce_service_category(value):
+    """Accept a ServiceCategory, its value ("Texas State Guard") or its name ("TEXAS_SG")"""
+    if isinstance(value, ServiceCategory):
+        return value
+    try:
+        return ServiceCategory(value)
+    except ValueError:
+        pass
+    try:
+        return ServiceCategory[value]
+    except KeyError:
+        raise ValueError(f"Unknown service category: {value!r}") from None
+
+def _as_date(value):
+    """Drop the time part of datetimes (including pandas Timestamps)"""
+    return value.date() if isinstance(value, datetime) else value
+
+DEFAULT_GRADE = 'E-1'  # Rates used for grades missing from the tables
+
+# Versioned rate data files (rates_<year>.json) and their compiled binary cache
+RATE_TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rate_tables')
+RATE_CACHE_DIR = os.environ.get('RATE_TABLE_CACHE_DIR', os.path.join(RATE_TABLE_DIR, '__cache__'))
+
+def is_officer_grade(grade):
+    """Return True for commissioned officer grades (including prior-enlisted O1E-O3E)"""
+    return grade.startswith(('O-', 'O1E', 'O2E', 'O3E'))
+
+class RateTable:
+    """One pay-table version, compiled into flat arrays indexed by grade and years of service.
+
+    Base pay lives in a grades x (max_years + 1) array, BAH in a grades x 2
+    array (without/with dependents) and BAS in a per-grade array, so every
+    lookup is a dict hit for the grade index plus one array read. The table
+    also carries the per diem, minimum daily rate and Texas SG rates in force
+    from its effective date.
+    """
+    __slots__ = ('effective_date', 'grade_index', 'max_years', 'base_pay', 'bah', 'bas', 'officer_bas',
+                 'enlisted_bas', 'per_diem', 'minimum_daily_rate', 'texas_sg')
+
+    # Header fields written alongside the arrays in a compiled table
+    _HEADER_FIELDS = ('grade_index', 'max_years', 'officer_bas', 'enlisted_bas', 'per_diem',
+                      'minimum_daily_rate', 'texas_sg')
+
+    def __init__(self, base_pay_rates, bah_rates, officer_bas, enlisted_bas, per_diem, minimum_daily_rate,
+                 texas_sg, effective_date=None):
+        self.effective_date = effective_date
+        self.grade_index = {grade: i for i, grade in enumerate(base_pay_rates)}
+        self.max_years = max(max(years) for years in base_pay_rates.values())
+
+        width = self.max_years + 1
+        self.base_pay = array('d', [0.0]) * (width * len(self.grade_index))
+        self.bah = array('d', [0.0]) * (2 * len(self.grade_index))
+        self.bas = array('d', [0.0]) * len(self.grade_index)
+
+        for grade, i in self.grade_index.items():
+            # Carry each rate forward so that missing years resolve to the
+            # closest bracket below them, as the pay table intends
+            grade_pay = base_pay_rates[grade]
+            rate = grade_pay[min(grade_pay)]
+            for year in range(width):
+                rate = grade_pay.get(year, rate)
+                self.base_pay[i * width + year] = rate
+
+            bah = bah_rates.get(grade, bah_rates[DEFAULT_GRADE])
+            self.bah[i * 2] = bah['without']
+            self.bah[i * 2 + 1] = bah['with']
+            self.bas[i] = officer_bas if is_officer_grade(grade) else enlisted_bas
+
+        self.officer_bas = officer_bas
+        self.enlisted_bas = enlisted_bas
+        self.per_diem = per_diem
+        self.minimum_daily_rate = minimum_daily_rate
+        self.texas_sg = texas_sg
+
+    @classmethod
+    def from_json(cls, path):
+        """Parse a rates_<year>.json data file"""
+        with open(path) as f:
+            data = json.load(f)
+        base_pay_rates = {
+            grade: rates if isinstance(rates, dict) else dict(enumerate(rates))
+            for grade, rates in data['base_pay'].items()
+        }
+        base_pay_rates = {grade: {int(year): rate for year, rate in rates.items()}
+                          for grade, rates in base_pay_rates.items()}
+        return cls(base_pay_rates, data['bah'], data['bas']['officer'], data['bas']['enlisted'],
+                   data['per_diem'], data['minimum_daily_rate'], data['texas_sg'],
+                   date.fromisoformat(data['effective_date']))
+
+    def save(self, path):
+        """Write the compiled table: a length-prefixed JSON header followed by the raw arrays"""
+        header = {name: getattr(self, name) for name in self._HEADER_FIELDS}
+        header['effective_date'] = self.effective_date.isoformat() if self.effective_date else None
+        header['byteorder'] = sys.byteorder
+        header = json.dumps(header).encode()
+        with open(path, 'wb') as f:
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            self.base_pay.tofile(f)
+            self.bah.tofile(f)
+            self.bas.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a table written by save() without re-parsing the source data"""
+        table = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            header = json.loads(f.read(int.from_bytes(f.read(4), 'little')))
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError(f"Compiled rate table {path} was written on a different platform")
+            for name in cls._HEADER_FIELDS:
+                setattr(table, name, header[name])
+            effective_date = header['effective_date']
+            table.effective_date = date.fromisoformat(effective_date) if effective_date else None
+
+            grades = len(table.grade_index)
+            table.base_pay = array('d')
+            table.base_pay.fromfile(f, grades * (table.max_years + 1))
+            table.bah = array('d')
+            table.bah.fromfile(f, grades * 2)
+            table.bas = array('d')
+            table.bas.fromfile(f, grades)
+        return table
+
+    def _grade(self, grade):
+        return self.grade_index.get(grade, self.grade_index[DEFAULT_GRADE])
+
+    def base_pay_rate(self, grade, years_of_service):
+        """Daily base pay for the closest years-of-service bracket at or below the given years"""
+        year = min(max(int(years_of_service), 0), self.max_years)
+        return self.base_pay[self._grade(grade) * (self.max_years + 1) + year]
+
+    def bah_rate(self, grade, has_dependents):
+        """Daily BAH with or without dependents"""
+        return self.bah[self._grade(grade) * 2 + (1 if has_dependents else 0)]
+
+    def bas_rate(self, grade):
+        """Daily BAS; grades outside the table fall back to the officer/enlisted split"""
+        i = self.grade_index.get(grade)
+        if i is None:
+            return self.officer_bas if is_officer_grade(grade) else self.enlisted_bas
+        return self.bas[i]
+
+def load_rate_table(path, cache_dir=RATE_CACHE_DIR):
+    """Load a rate data file, going through its compiled copy in cache_dir when one is current.
+
+    The compiled file is keyed by the source's size and modification time, so
+    editing the data file recompiles it. A cache directory that cannot be
+    written (e.g. a read-only image) just means parsing the source each time.
+    """
+    stat = os.stat(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    compiled = os.path.join(cache_dir, f"{name}-{stat.st_size}-{stat.st_mtime_ns}.bin")
+    try:
+        table = RateTable.load(compiled)
+        METRICS.count('rates.compiled_cache.hit')
+        return table
+    except (OSError, ValueError, KeyError):
+        METRICS.count('rates.compiled_cache.miss')
+
+    with METRICS.timer('rates.compile'):
+        table = RateTable.from_json(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = f"{compiled}.{os.getpid()}.tmp"
+        table.save(temporary)
+        os.replace(temporary, compiled)
+    except OSError:
+        pass
+    return table
+
+def load_rate_tables(directory=RATE_TABLE_DIR, cache_dir=RATE_CACHE_DIR):
+    """Load every rates_*.json in directory, ordered by effective date"""
+    paths = glob.glob(os.path.join(directory, 'rates_*.json'))
+    if not paths:
+        raise FileNotFoundError(f"No rate tables found in {directory}")
+    tables = [load_rate_table(path, cache_dir) for path in paths]
+    return sorted(tables, key=lambda table: table.effective_date)
+
+# Every known pay-table version, oldest first, and their effective dates
+RATE_TABLES = load_rate_tables()
+RATE_TABLE_DATES = [table.effective_date for table in RATE_TABLES]
+
+def rate_table_for(on_date):
+    """Return the pay-table version in force on a date (the oldest one for earlier dates)"""
+    if len(RATE_TABLES) == 1:
+        return RATE_TABLES[0]
+    index = bisect_right(RATE_TABLE_DATES, _as_date(on_date))
+    return RATE_TABLES[max(index - 1, 0)]
+
+# Table forced onto every order by set_rate_table; None picks tables by date
+_pinned_rate_table = None
+
+# Rates in force when the module was loaded, kept as module constants for
+# callers that read them directly; the engine picks tables by each order's dates
+TEXAS_SG_RATES = rate_table_for(date.today()).texas_sg
+PER_DIEM_RATE = rate_table_for(date.today()).per_diem
+MINIMUM_DAILY_RATE = rate_table_for(date.today()).minimum_daily_rate
+
+def get_rate_table(on_date=None):
+    """Return the pay table in force on on_date (today by default), or the one set with set_rate_table"""
+    if _pinned_rate_table is not None:
+        return _pinned_rate_table
+    if len(RATE_TABLES) == 1:
+        return RATE_TABLES[0]
+    return rate_table_for(date.today() if on_date is None else on_date)
+
+def set_rate_table(table):
+    """Use one rate table for every order regardless of its dates; None goes back to picking by date.
+
+    Cached pay results are keyed on the tables they used, so none need dropping.
+    """
+    global _pinned_rate_table
+    _pinned_rate_table = table
+
+def rate_table_periods(start_date, end_date):
+    """Split a date range into (first_day, last_day, table) periods, one per pay-table version in force"""
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    if _pinned_rate_table is not None:
+        return [(start_date, end_date, _pinned_rate_table)]
+    periods = [(start_date, rate_table_for(start_date))]
+    periods += [(table.effective_date, table) for table in RATE_TABLES
+                if start_date < table.effective_date <= end_date]
+    ends = [first_day - timedelta(days=1) for first_day, _ in periods[1:]] + [end_date]
+    return [(first_day, last_day, table) for (first_day, table), last_day in zip(periods, ends)]
+
+def order_rate_tables(start_date, end_date):
+    """The pay-table versions an order's days fall under, oldest first"""
+    return tuple(table for _, _, table in rate_table_periods(start_date, end_date))
+
+def rate_table_events(start_date, end_date):
+    """Rate events that switch an order to each pay-table version in force between its dates.
+
+    calculate_pay_result applies these by itself, so an order that crosses a
+    January pay raise (or any other table change) is paid from the right
+    table for every day.
+    """
+    return [RateEvent(first_day, rate_table=table) for first_day, _, table in rate_table_periods(start_date, end_date)]
+
+def calculate_minimum_income_adjustment(daily_base_rate, daily_bah_rate, daily_bas_rate, rate_table=None):
     """Calculate the minimum income adjustment if needed"""
+    rate_table = rate_table or get_rate_table()
+
     # Calculate daily total (Base Pay + BAH + BAS + Per Diem)
-    daily_total = daily_base_rate + daily_bah_rate + daily_bas_rate + PER_DIEM_RATE
-    
+    daily_total = daily_base_rate + daily_bah_rate + daily_bas_rate + rate_table.per_diem
+
     # If the total is less than the minimum daily rate, calculate the adjustment needed
-    if daily_total < MINIMUM_DAILY_RATE:
-        return MINIMUM_DAILY_RATE - daily_total
-    
+    if daily_total < rate_table.minimum_daily_rate:
+        return rate_table.minimum_daily_rate - daily_total
+
     # No adjustment needed if the total already meets or exceeds the minimum
     return 0.0
 
 def get_base_pay_rate(grade, years_of_service):
     """Calculate daily base pay rate based on military grade and years of service"""
-    # Daily base pay rates from 2024 military pay table
-    pay_grades = {
-        'O-6': {
-            0: 297.70, 1: 297.70, 2: 325.40, 3: 345.67, 4: 345.67, 5: 345.67,
-            6: 346.93, 7: 346.93, 8: 361.08, 9: 361.08, 10: 362.96, 11: 362.96,
-            12: 362.96, 13: 362.96, 14: 382.64, 15: 382.64, 16: 417.43, 17: 417.43,
-            18: 437.85, 19: 437.85, 20: 458.26, 21: 458.26, 22: 469.88, 23: 469.88,
-            24: 481.64, 25: 481.64, 26: 504.43, 27: 504.43, 28: 504.43, 29: 504.43,
-            30: 514.17, 31: 514.17, 32: 514.17, 33: 514.17, 34: 514.17, 35: 514.17,
-            36: 514.17, 37: 514.17, 38: 514.17, 39: 514.17, 40: 514.17
-        },
-        'O-5': {
-            0: 250.95, 1: 250.95, 2: 280.58, 3: 298.85, 4: 302.29, 5: 302.29,
-            6: 313.70, 7: 313.70, 8: 320.50, 9: 320.50, 10: 335.50, 11: 335.50,
-            12: 346.53, 13: 346.53, 14: 360.76, 15: 360.76, 16: 382.48, 17: 382.48,
-            18: 392.84, 19: 392.84, 20: 403.08, 21: 403.08, 22: 414.70, 23: 414.70,
-            24: 414.70, 25: 414.70, 26: 414.70, 27: 414.70, 28: 414.70, 29: 414.70,
-            30: 414.70, 31: 414.70, 32: 414.70, 33: 414.70, 34: 414.70, 35: 414.70,
-            36: 414.70, 37: 414.70, 38: 414.70, 39: 414.70, 40: 414.70
-        },
-        'O-4': {
-            0: 218.81, 1: 218.81, 2: 250.66, 3: 266.30, 4: 269.75, 5: 269.75,
-            6: 284.24, 7: 284.24, 8: 299.79, 9: 299.79, 10: 319.17, 11: 319.17,
-            12: 334.21, 13: 334.21, 14: 344.69, 15: 344.69, 16: 350.70, 17: 350.70,
-            18: 354.17, 19: 354.17, 20: 354.17, 21: 354.17, 22: 354.17, 23: 354.17,
-            24: 354.17, 25: 354.17, 26: 354.17, 27: 354.17, 28: 354.17, 29: 354.17,
-            30: 354.17, 31: 354.17, 32: 354.17, 33: 354.17, 34: 354.17, 35: 354.17,
-            36: 354.17, 37: 354.17, 38: 354.17, 39: 354.17, 40: 354.17
-        },
-        'O-3': {
-            0: 194.39, 1: 194.39, 2: 218.14, 3: 234.09, 4: 253.75, 5: 253.75,
-            6: 265.13, 7: 265.13, 8: 277.60, 9: 277.60, 10: 285.64, 11: 285.64,
-            12: 298.89, 13: 298.89, 14: 305.82, 15: 305.82, 16: 305.82, 17: 305.82,
-            18: 305.82, 19: 305.82, 20: 305.82, 21: 305.82, 22: 305.82, 23: 305.82,
-            24: 305.82, 25: 305.82, 26: 305.82, 27: 305.82, 28: 305.82, 29: 305.82,
-            30: 305.82, 31: 305.82, 32: 305.82, 33: 305.82, 34: 305.82, 35: 305.82,
-            36: 305.82, 37: 305.82, 38: 305.82, 39: 305.82, 40: 305.82
-        },
-        'O-2': {
-            0: 170.23, 1: 170.23, 2: 191.56, 3: 218.10, 4: 224.91, 5: 224.91,
-            6: 229.18, 7: 229.18, 8: 229.18, 9: 229.18, 10: 229.18, 11: 229.18,
-            12: 229.18, 13: 229.18, 14: 229.18, 15: 229.18, 16: 229.18, 17: 229.18,
-            18: 229.18, 19: 229.18, 20: 229.18, 21: 229.18, 22: 229.18, 23: 229.18,
-            24: 229.18, 25: 229.18, 26: 229.18, 27: 229.18, 28: 229.18, 29: 229.18,
-            30: 229.18, 31: 229.18, 32: 229.18, 33: 229.18, 34: 229.18, 35: 229.18,
-            36: 229.18, 37: 229.18, 38: 229.18, 39: 229.18, 40: 229.18
-        },
-        'O-1': {
-            0: 149.95, 1: 149.95, 2: 155.40, 3: 184.38, 4: 184.38, 5: 184.38,
-            6: 184.38, 7: 184.38, 8: 184.38, 9: 184.38, 10: 184.38, 11: 184.38,
-            12: 184.38, 13: 184.38, 14: 184.38, 15: 184.38, 16: 184.38, 17: 184.38,
-            18: 184.38, 19: 184.38, 20: 184.38, 21: 184.38, 22: 184.38, 23: 184.38,
-            24: 184.38, 25: 184.38, 26: 184.38, 27: 184.38, 28: 184.38, 29: 184.38,
-            30: 184.38, 31: 184.38, 32: 184.38, 33: 184.38, 34: 184.38, 35: 184.38,
-            36: 184.38, 37: 184.38, 38: 184.38, 39: 184.38, 40: 184.38
-        },
-        'O3E': {
-            0: 0.00, 1: 0.00, 2: 0.00, 3: 0.00, 4: 253.75, 5: 253.75,
-            6: 265.13, 7: 265.13, 8: 277.60, 9: 277.60, 10: 285.64, 11: 285.64,
-            12: 298.89, 13: 298.89, 14: 310.09, 15: 310.09, 16: 316.51, 17: 316.51,
-            18: 325.26, 19: 325.26, 20: 325.26, 21: 325.26, 22: 325.26, 23: 325.26,
-            24: 325.26, 25: 325.26, 26: 325.26, 27: 325.26, 28: 325.26, 29: 325.26,
-            30: 325.26, 31: 325.26, 32: 325.26, 33: 325.26, 34: 325.26, 35: 325.26,
-            36: 325.26, 37: 325.26, 38: 325.26, 39: 325.26, 40: 325.26
-        },
-        'O2E': {
-            0: 0.00, 1: 0.00, 2: 0.00, 3: 0.00, 4: 224.91, 5: 224.91,
-            6: 229.18, 7: 229.18, 8: 235.94, 9: 235.94, 10: 247.36, 11: 247.36,
-            12: 256.20, 13: 256.20, 14: 262.77, 15: 262.77, 16: 262.77, 17: 262.77,
-            18: 262.77, 19: 262.77, 20: 262.77, 21: 262.77, 22: 262.77, 23: 262.77,
-            24: 262.77, 25: 262.77, 26: 262.77, 27: 262.77, 28: 262.77, 29: 262.77,
-            30: 262.77, 31: 262.77, 32: 262.77, 33: 262.77, 34: 262.77, 35: 262.77,
-            36: 262.77, 37: 262.77, 38: 262.77, 39: 262.77, 40: 262.77
-        },
-        'O1E': {
-            0: 0.00, 1: 0.00, 2: 0.00, 3: 0.00, 4: 184.38, 5: 184.38,
-            6: 195.75, 7: 195.75, 8: 202.38, 9: 202.38, 10: 209.15, 11: 209.15,
-            12: 215.79, 13: 215.79, 14: 224.91, 15: 224.91, 16: 224.91, 17: 224.91,
-            18: 224.91, 19: 224.91, 20: 224.91, 21: 224.91, 22: 224.91, 23: 224.91,
-            24: 224.91, 25: 224.91, 26: 224.91, 27: 224.91, 28: 224.91, 29: 224.91,
-            30: 224.91, 31: 224.91, 32: 224.91, 33: 224.91, 34: 224.91, 35: 224.91,
-            36: 224.91, 37: 224.91, 38: 224.91, 39: 224.91, 40: 224.91
-        },
-        'W-5': {
-            0: 0.00, 1: 0.00, 2: 0.00, 3: 0.00, 4: 0.00, 5: 0.00,
-            6: 0.00, 7: 0.00, 8: 0.00, 9: 0.00, 10: 0.00, 11: 0.00,
-            12: 0.00, 13: 0.00, 14: 0.00, 15: 0.00, 16: 0.00, 17: 0.00,
-            18: 0.00, 19: 0.00, 20: 343.25, 21: 343.25, 22: 359.82, 23: 359.82,
-            24: 372.17, 25: 372.17, 26: 385.81, 27: 385.81, 28: 385.81, 29: 385.81,
-            30: 404.30, 31: 404.30, 32: 404.30, 33: 404.30, 34: 423.65, 35: 423.65,
-            36: 423.65, 37: 423.65, 38: 444.04, 39: 444.04, 40: 444.04
-        },
-        'W-4': {
-            0: 200.35, 1: 200.35, 2: 214.23, 3: 219.90, 4: 225.48, 5: 225.48,
-            6: 235.10, 7: 235.10, 8: 244.61, 9: 244.61, 10: 254.24, 11: 254.24,
-            12: 268.70, 13: 268.70, 14: 281.40, 15: 281.40, 16: 293.48, 17: 293.48,
-            18: 303.39, 19: 303.39, 20: 313.04, 21: 313.04, 22: 327.19, 23: 327.19,
-            24: 338.83, 25: 338.83, 26: 352.10, 27: 352.10, 28: 352.10, 29: 352.10,
-            30: 358.79, 31: 358.79, 32: 358.79, 33: 358.79, 34: 358.79, 35: 358.79,
-            36: 358.79, 37: 358.79, 38: 358.79, 39: 358.79, 40: 358.79
-        },
-        'W-3': {
-            0: 184.41, 1: 184.41, 2: 191.38, 3: 198.57, 4: 200.90, 5: 200.90,
-            6: 208.41, 7: 208.41, 8: 223.19, 9: 223.19, 10: 238.59, 11: 238.59,
-            12: 245.84, 13: 245.84, 14: 254.23, 15: 254.23, 16: 262.85, 17: 262.85,
-            18: 278.40, 19: 278.40, 20: 288.88, 21: 288.88, 22: 295.15, 23: 295.15,
-            24: 301.82, 25: 301.82, 26: 310.91, 27: 310.91, 28: 310.91, 29: 310.91,
-            30: 310.91, 31: 310.91, 32: 310.91, 33: 310.91, 34: 310.91, 35: 310.91,
-            36: 310.91, 37: 310.91, 38: 310.91, 39: 310.91, 40: 310.91
-        },
-        'W-2': {
-            0: 165.09, 1: 165.09, 2: 179.13, 3: 183.44, 4: 186.42, 5: 186.42,
-            6: 196.03, 7: 196.03, 8: 210.99, 9: 210.99, 10: 218.42, 11: 218.42,
-            12: 225.71, 13: 225.71, 14: 234.64, 15: 234.64, 16: 241.62, 17: 241.62,
-            18: 247.93, 19: 247.93, 20: 255.49, 21: 255.49, 22: 260.46, 23: 260.46,
-            24: 264.40, 25: 264.40, 26: 264.40, 27: 264.40, 28: 264.40, 29: 264.40,
-            30: 264.40, 31: 264.40, 32: 264.40, 33: 264.40, 34: 264.40, 35: 264.40,
-            36: 264.40, 37: 264.40, 38: 264.40, 39: 264.40, 40: 264.40
-        },
-        'W-1': {
-            0: 146.94, 1: 146.94, 2: 160.98, 3: 164.74, 4: 172.71, 5: 172.71,
-            6: 182.12, 7: 182.12, 8: 196.00, 9: 196.00, 10: 202.48, 11: 202.48,
-            12: 211.57, 13: 211.57, 14: 220.48, 15: 220.48, 16: 227.49, 17: 227.49,
-            18: 233.95, 19: 233.95, 20: 241.79, 21: 241.79, 22: 241.79, 23: 241.79,
-            24: 241.79, 25: 241.79, 26: 241.79, 27: 241.79, 28: 241.79, 29: 241.79,
-            30: 241.79, 31: 241.79, 32: 241.79, 33: 241.79, 34: 241.79, 35: 241.79,
-            36: 241.79, 37: 241.79, 38: 241.79, 39: 241.79, 40: 241.79
-        },
-        'E-9': {
-            0: 0.00, 1: 0.00, 2: 0.00, 3: 0.00, 4: 0.00, 5: 0.00,
-            6: 0.00, 7: 0.00, 8: 0.00, 9: 0.00, 10: 238.58, 11: 238.58,
-            12: 243.60, 13: 243.60, 14: 249.93, 15: 249.93, 16: 257.39, 17: 257.39,
-            18: 264.93, 19: 264.93, 20: 276.95, 21: 276.95, 22: 287.16, 23: 287.16,
-            24: 297.87, 25: 297.87, 26: 314.29, 27: 314.29, 28: 314.29, 29: 314.29,
-            30: 329.14, 31: 329.14, 32: 329.14, 33: 329.14, 34: 344.78, 35: 344.78,
-            36: 344.78, 37: 344.78, 38: 361.22, 39: 361.22, 40: 361.22
-        },
-        'E-8': {
-            0: 0.00, 1: 0.00, 2: 0.00, 3: 0.00, 4: 0.00, 5: 0.00,
-            6: 0.00, 7: 0.00, 8: 198.32, 9: 198.32, 10: 206.36, 11: 206.36,
-            12: 211.33, 13: 211.33, 14: 217.29, 15: 217.29, 16: 223.74, 17: 223.74,
-            18: 235.40, 19: 235.40, 20: 241.31, 21: 241.31, 22: 251.36, 23: 251.36,
-            24: 256.93, 25: 256.93, 26: 270.65, 27: 270.65, 28: 270.65, 29: 270.65,
-            30: 275.74, 31: 275.74, 32: 275.74, 33: 275.74, 34: 275.74, 35: 275.74,
-            36: 275.74, 37: 275.74, 38: 275.74, 39: 275.74, 40: 275.74
-        },
-        'E-7': {
-            0: 142.94, 1: 142.94, 2: 154.48, 3: 154.48, 4: 166.74, 5: 166.74,
-            6: 172.22, 7: 172.22, 8: 181.59, 9: 181.59, 10: 186.88, 11: 186.88,
-            12: 196.24, 13: 196.24, 14: 204.05, 15: 204.05, 16: 209.38, 17: 209.38,
-            18: 215.04, 19: 215.04, 20: 217.24, 21: 217.24, 22: 224.61, 23: 224.61,
-            24: 228.56, 25: 228.56, 26: 243.63, 27: 243.63, 28: 243.63, 29: 243.63,
-            30: 243.63, 31: 243.63, 32: 243.63, 33: 243.63, 34: 243.63, 35: 243.63,
-            36: 243.63, 37: 243.63, 38: 243.63, 39: 243.63, 40: 243.63
-        },
-        'E-6': {
-            0: 125.89, 1: 125.89, 2: 136.87, 3: 136.87, 4: 147.33, 5: 147.33,
-            6: 152.69, 7: 152.69, 8: 164.80, 9: 164.80, 10: 169.51, 11: 169.51,
-            12: 178.63, 13: 178.63, 14: 181.42, 15: 181.42, 16: 183.45, 17: 183.45,
-            18: 185.83, 19: 185.83, 20: 185.83, 21: 185.83, 22: 185.83, 23: 185.83,
-            24: 185.83, 25: 185.83, 26: 185.83, 27: 185.83, 28: 185.83, 29: 185.83,
-            30: 185.83, 31: 185.83, 32: 185.83, 33: 185.83, 34: 185.83, 35: 185.83,
-            36: 185.83, 37: 185.83, 38: 185.83, 39: 185.83, 40: 185.83
-        },
-        'E-5': {
-            0: 116.72, 1: 116.72, 2: 123.46, 3: 123.46, 4: 133.91, 5: 133.91,
-            6: 142.13, 7: 142.13, 8: 150.73, 9: 150.73, 10: 157.82, 11: 157.82,
-            12: 158.66, 13: 158.66, 14: 158.66, 15: 158.66, 16: 158.66, 17: 158.66,
-            18: 158.66, 19: 158.66, 20: 158.66, 21: 158.66, 22: 158.66, 23: 158.66,
-            24: 158.66, 25: 158.66, 26: 158.66, 27: 158.66, 28: 158.66, 29: 158.66,
-            30: 158.66, 31: 158.66, 32: 158.66, 33: 158.66, 34: 158.66, 35: 158.66,
-            36: 158.66, 37: 158.66, 38: 158.66, 39: 158.66, 40: 158.66
-        },
-        'E-4': {
-            0: 108.41, 1: 108.41, 2: 113.10, 3: 113.10, 4: 123.48, 5: 123.48,
-            6: 128.05, 7: 128.05, 8: 128.05, 9: 128.05, 10: 128.05, 11: 128.05,
-            12: 128.05, 13: 128.05, 14: 128.05, 15: 128.05, 16: 128.05, 17: 128.05,
-            18: 128.05, 19: 128.05, 20: 128.05, 21: 128.05, 22: 128.05, 23: 128.05,
-            24: 128.05, 25: 128.05, 26: 128.05, 27: 128.05, 28: 128.05, 29: 128.05,
-            30: 128.05, 31: 128.05, 32: 128.05, 33: 128.05, 34: 128.05, 35: 128.05,
-            36: 128.05, 37: 128.05, 38: 128.05, 39: 128.05, 40: 128.05
-        },
-        'E-3': {
-            0: 99.49, 1: 99.49, 2: 104.69, 3: 104.69, 4: 110.03, 5: 110.03,
-            6: 110.03, 7: 110.03, 8: 110.03, 9: 110.03, 10: 110.03, 11: 110.03,
-            12: 110.03, 13: 110.03, 14: 110.03, 15: 110.03, 16: 110.03, 17: 110.03,
-            18: 110.03, 19: 110.03, 20: 110.03, 21: 110.03, 22: 110.03, 23: 110.03,
-            24: 110.03, 25: 110.03, 26: 110.03, 27: 110.03, 28: 110.03, 29: 110.03,
-            30: 110.03, 31: 110.03, 32: 110.03, 33: 110.03, 34: 110.03, 35: 110.03,
-            36: 110.03, 37: 110.03, 38: 110.03, 39: 110.03, 40: 110.03
-        },
-        'E-2': {
-            0: 95.43, 1: 95.43, 2: 95.43, 3: 95.43, 4: 95.43, 5: 95.43,
-            6: 95.43, 7: 95.43, 8: 95.43, 9: 95.43, 10: 95.43, 11: 95.43,
-            12: 95.43, 13: 95.43, 14: 95.43, 15: 95.43, 16: 95.43, 17: 95.43,
-            18: 95.43, 19: 95.43, 20: 95.43, 21: 95.43, 22: 95.43, 23: 95.43,
-            24: 95.43, 25: 95.43, 26: 95.43, 27: 95.43, 28: 95.43, 29: 95.43,
-            30: 95.43, 31: 95.43, 32: 95.43, 33: 95.43, 34: 95.43, 35: 95.43,
-            36: 95.43, 37: 95.43, 38: 95.43, 39: 95.43, 40: 95.43
-        },
-        'E-1': {
-            0: 86.94, 1: 86.94, 2: 86.94, 3: 86.94, 4: 86.94, 5: 86.94,
-            6: 86.94, 7: 86.94, 8: 86.94, 9: 86.94, 10: 86.94, 11: 86.94,
-            12: 86.94, 13: 86.94, 14: 86.94, 15: 86.94, 16: 86.94, 17: 86.94,
-            18: 86.94, 19: 86.94, 20: 86.94, 21: 86.94, 22: 86.94, 23: 86.94,
-            24: 86.94, 25: 86.94, 26: 86.94, 27: 86.94, 28: 86.94, 29: 86.94,
-            30: 86.94, 31: 86.94, 32: 86.94, 33: 86.94, 34: 86.94, 35: 86.94,
-            36: 86.94, 37: 86.94, 38: 86.94, 39: 86.94, 40: 86.94
-        }
-    }
-
-    # Find the appropriate pay based on years of service
-    grade_pay = pay_grades.get(grade, pay_grades['E-1'])
-
-    # Find the closest year bracket that's less than or equal to the given years of service
-    valid_years = sorted([y for y in grade_pay.keys() if y <= years_of_service])
-    if not valid_years:
-        year_bracket = min(grade_pay.keys())
-    else:
-        year_bracket = max(valid_years)
-
-    return grade_pay[year_bracket]
+    return get_rate_table().base_pay_rate(grade, years_of_service)
 
 def get_bah_rate(grade, has_dependents):
     """Get daily BAH rate based on grade and dependent status"""
-    # BAH rates from the provided table
-    bah_rates = {
-        'O-6': {'without': 72.35, 'with': 87.39},
-        'O-5': {'without': 69.67, 'with': 84.24},
-        'O-4': {'without': 64.55, 'with': 74.24},
-        'O-3': {'without': 51.77, 'with': 61.43},
-        'O-2': {'without': 41.01, 'with': 52.41},
-        'O-1': {'without': 35.21, 'with': 46.92},
-        'O3E': {'without': 55.87, 'with': 66.02},
-        'O2E': {'without': 47.51, 'with': 59.58},
-        'O1E': {'without': 41.32, 'with': 55.07},
-        'W-5': {'without': 65.62, 'with': 71.70},
-        'W-4': {'without': 58.26, 'with': 65.73},
-        'W-3': {'without': 48.98, 'with': 60.25},
-        'W-2': {'without': 43.47, 'with': 55.36},
-        'W-1': {'without': 36.45, 'with': 47.92},
-        'E-9': {'without': 47.82, 'with': 63.07},
-        'E-8': {'without': 43.96, 'with': 58.17},
-        'E-7': {'without': 40.49, 'with': 53.97},
-        'E-6': {'without': 37.42, 'with': 49.88},
-        'E-5': {'without': 33.68, 'with': 44.90},
-        'E-4': {'without': 33.68, 'with': 44.90},
-        'E-3': {'without': 33.68, 'with': 44.90},
-        'E-2': {'without': 33.68, 'with': 44.90},
-        'E-1': {'without': 33.68, 'with': 44.90},
-    }
-
-    rates = bah_rates.get(grade, bah_rates['E-1'])
-    return rates['with'] if has_dependents else rates['without']
+    return get_rate_table().bah_rate(grade, has_dependents)
 
 def get_bas_rate(grade):
     """Get daily BAS rate based on whether the member is an officer or enlisted"""
-    if grade.startswith(('O-', 'O1E', 'O2E', 'O3E')):
-        return 10.69  # Officer BAS rate
-    return 15.53  # Enlisted BAS rate (including warrant officers)
+    return get_rate_table().bas_rate(grade)
 
 def get_hazardous_duty_pay(has_completed_365_days, present_this_month):
     """Calculate Hazardous Duty Allowance"""
@@ -320,144 +309,694 @@ def calculate_daily_allowances(grade, has_dependents):
     # Return the exact BAH and BAS rates without adjustment
     return round(daily_bah_rate, 2), round(daily_bas_rate, 2)
 
-def calculate_texas_sg_pay(start_date, end_date):
-    """Calculate pay for Texas State Guard with fixed rates"""
-    current_date = start_date
-    monthly_breakdown = {}
-
-    while current_date <= end_date:
-        month_key = current_date.strftime('%B %Y')
-
-        # Calculate days in this month
-        month_start = max(start_date, date(current_date.year, current_date.month, 1))
-        if current_date.month == 12:
-            next_month = date(current_date.year + 1, 1, 1)
+def month_segments(start_date, end_date):
+    """Split an inclusive date range into (year, month, days) segments, one per calendar month.
+
+    Segment lengths come straight from the calendar, so no intermediate dates
+    are created; an end date before the start date yields no segments.
+    """
+    if end_date < start_date:
+        return []
+
+    first = start_date.year * 12 + start_date.month - 1
+    last = end_date.year * 12 + end_date.month - 1
+    segments = []
+    for period in range(first, last + 1):
+        year, month = divmod(period, 12)
+        month += 1
+        first_day = start_date.day if period == first else 1
+        last_day = end_date.day if period == last else monthrange(year, month)[1]
+        segments.append((year, month, last_day - first_day + 1))
+    return segments
+
+def format_month_key(year, month):
+    """Format a month the way breakdowns are keyed, e.g. 'January 2024'"""
+    return f"{month_name[month]} {year}"
+
+# Month components in monthly_breakdown order for Army/Air NG and Texas SG results
+NG_MONTH_FIELDS = ('days', 'base_pay', 'bah', 'bas', 'per_diem', 'minimum_income_adjustment',
+                   'hazard_pay', 'hardship_pay', 'danger_pay', 'total')
+TEXAS_SG_MONTH_FIELDS = ('days', 'base_pay', 'special_pay', 'allowances', 'total', 'bah', 'bas',
+                         'per_diem', 'minimum_income_adjustment', 'hazard_pay', 'hardship_pay', 'danger_pay')
+
+_MONTH_NUMBERS = {name: number for number, name in enumerate(month_name) if name}
+
+@dataclass(frozen=True, slots=True)
+class MonthlyPay:
+    """Pay components for one calendar month of an order"""
+    year: int
+    month: int
+    days: int
+    base_pay: float = 0
+    bah: float = 0
+    bas: float = 0
+    per_diem: float = 0
+    minimum_income_adjustment: float = 0
+    hazard_pay: float = 0
+    hardship_pay: float = 0
+    danger_pay: float = 0
+    special_pay: float = 0
+    allowances: float = 0
+    total: float = 0
+
+    @property
+    def period(self):
+        """Integer month key (year * 12 + month - 1) that sorts chronologically"""
+        return self.year * 12 + self.month - 1
+
+    @property
+    def key(self):
+        """Month key used by monthly_breakdown dicts, e.g. 'January 2024'"""
+        return format_month_key(self.year, self.month)
+
+    def to_dict(self, texas_sg=False):
+        """Return the monthly_breakdown entry for this month"""
+        fields = TEXAS_SG_MONTH_FIELDS if texas_sg else NG_MONTH_FIELDS
+        return {field: getattr(self, field) for field in fields}
+
+    @classmethod
+    def from_dict(cls, month_key, values):
+        """Build a record from a monthly_breakdown key and entry"""
+        name, year = month_key.rsplit(' ', 1)
+        return cls(int(year), _MONTH_NUMBERS[name], **values)
+
+@dataclass(frozen=True, slots=True)
+class PayResult:
+    """Result of a pay calculation with months held as MonthlyPay records in chronological order"""
+    texas_sg: bool
+    daily_base_rate: float
+    months: tuple
+    total_days: int
+    grand_total: float
+    daily_bah_rate: float = None
+    daily_bas_rate: float = None
+    daily_per_diem_rate: float = None
+    daily_adjustment_rate: float = None
+    daily_special_rate: float = None
+    daily_allowance_rate: float = None
+    # PayInputs the result was calculated from, when known (not part of equality)
+    inputs: tuple = field(default=None, compare=False, repr=False)
+    # Template to_dict() copies from, built on first use and never handed out
+    _dict: dict = field(default=None, init=False, compare=False, repr=False)
+
+    def to_dict(self):
+        """Return the result in the dict shape calculate_total_pay has always returned, as a new dict"""
+        template = self._dict
+        if template is None:
+            template = self._build_dict()
+            object.__setattr__(self, '_dict', template)
+        # Values are numbers, so copying both dict levels leaves nothing shared
+        return {**template,
+                'monthly_breakdown': {key: month.copy() for key, month in template['monthly_breakdown'].items()}}
+
+    def _build_dict(self):
+        if self.texas_sg:
+            rates = {
+                'daily_base_rate': self.daily_base_rate,
+                'daily_special_rate': self.daily_special_rate,
+                'daily_allowance_rate': self.daily_allowance_rate,
+            }
         else:
-            next_month = date(current_date.year, current_date.month + 1, 1)
-        month_end = min(end_date, next_month - pd.Timedelta(days=1))
-        days_in_month = (month_end - month_start).days + 1
-
-        # Calculate fixed rate pay components
-        base_pay = TEXAS_SG_RATES['daily_base_rate'] * days_in_month
-        special_pay = TEXAS_SG_RATES['special_pay'] * days_in_month
-        allowances = TEXAS_SG_RATES['daily_allowance'] * days_in_month
-        monthly_total = TEXAS_SG_RATES['total_daily_rate'] * days_in_month
-
-        monthly_breakdown[month_key] = {
-            'days': days_in_month,
-            'base_pay': round(base_pay, 2),
-            'special_pay': round(special_pay, 2),
-            'allowances': round(allowances, 2),
-            'total': round(monthly_total, 2),
-            # Set other pay types to 0 for consistent reporting
-            'bah': 0,
-            'bas': 0,
-            'per_diem': 0,
-            'minimum_income_adjustment': 0,
-            'hazard_pay': 0,
-            'hardship_pay': 0,
-            'danger_pay': 0
+            rates = {
+                'daily_base_rate': self.daily_base_rate,
+                'daily_bah_rate': self.daily_bah_rate,
+                'daily_bas_rate': self.daily_bas_rate,
+                'daily_per_diem_rate': self.daily_per_diem_rate,
+                'daily_adjustment_rate': self.daily_adjustment_rate,
+            }
+        return {
+            **rates,
+            'monthly_breakdown': {month.key: month.to_dict(self.texas_sg) for month in self.months},
+            'total_days': self.total_days,
+            'grand_total': self.grand_total,
         }
 
-        # Move to next month
-        if current_date.month == 12:
-            current_date = date(current_date.year + 1, 1, 1)
+    @classmethod
+    def from_dict(cls, pay_info):
+        """Build a PayResult from a calculate_total_pay dict"""
+        rates = {key: value for key, value in pay_info.items() if key.startswith('daily_')}
+        months = tuple(MonthlyPay.from_dict(key, values) for key, values in pay_info['monthly_breakdown'].items())
+        return cls('daily_special_rate' in pay_info, months=months, total_days=pay_info['total_days'],
+                   grand_total=pay_info['grand_total'], **rates)
+
+    @property
+    def month_index(self):
+        """Chronological tuple of the integer period keys of every month"""
+        return tuple(month.period for month in self.months)
+
+def as_pay_result(pay_info):
+    """Accept either a PayResult or a calculate_total_pay dict and return a PayResult"""
+    return pay_info if isinstance(pay_info, PayResult) else PayResult.from_dict(pay_info)
+
+def merge_months(original, correct):
+    """Pair up the months of two results in chronological order.
+
+    Both month tuples are already sorted by period, so a single linear merge
+    lines them up; a month present on only one side is paired with an empty
+    (0 days, all zero) record. Accepts PayResults or calculate_total_pay dicts.
+    """
+    original_months = as_pay_result(original).months
+    correct_months = as_pay_result(correct).months
+    pairs = []
+    i = j = 0
+    while i < len(original_months) or j < len(correct_months):
+        orig = original_months[i] if i < len(original_months) else None
+        corr = correct_months[j] if j < len(correct_months) else None
+        if corr is None or (orig is not None and orig.period < corr.period):
+            pairs.append((orig, MonthlyPay(orig.year, orig.month, 0)))
+            i += 1
+        elif orig is None or corr.period < orig.period:
+            pairs.append((MonthlyPay(corr.year, corr.month, 0), corr))
+            j += 1
         else:
-            current_date = date(current_date.year, current_date.month + 1, 1)
+            pairs.append((orig, corr))
+            i += 1
+            j += 1
+    return pairs
+
+@dataclass(frozen=True, slots=True)
+class MonthDiff:
+    """One month of an original vs. correct comparison"""
+    original: MonthlyPay
+    correct: MonthlyPay
+
+    @property
+    def key(self):
+        """Month key, e.g. 'January 2024'"""
+        return self.original.key
+
+    def delta(self, component):
+        """Correct minus original for one pay component (positive means underpaid)"""
+        return getattr(self.correct, component) - getattr(self.original, component)
+
+    @property
+    def total(self):
+        """Correct minus original monthly total"""
+        return self.delta('total')
+
+@dataclass(frozen=True, slots=True)
+class PayDiff:
+    """Original vs. correct pay for one order, month by month"""
+    original_total: float
+    correct_total: float
+    months: tuple
+
+    @property
+    def difference(self):
+        """Correct minus original grand total (positive means underpaid)"""
+        return self.correct_total - self.original_total
+
+    @property
+    def underpayment(self):
+        """Sum of the months that were underpaid"""
+        return round(sum(month.total for month in self.months if month.total > 0), 2)
+
+    @property
+    def overpayment(self):
+        """Sum of the months that were overpaid, as a positive amount"""
+        return round(-sum(month.total for month in self.months if month.total < 0), 2)
+
+def diff_pay(original, correct):
+    """Compare original and correct pay (PayResults or calculate_total_pay dicts) month by month"""
+    original, correct = as_pay_result(original), as_pay_result(correct)
+    months = tuple(MonthDiff(orig, corr) for orig, corr in merge_months(original, correct))
+    return PayDiff(original.grand_total, correct.grand_total, months)
+
+def _texas_sg_result_rates(texas_sg_rates):
+    """Daily rates reported on a Texas SG result"""
+    return {
+        'daily_base_rate': texas_sg_rates['daily_base_rate'],
+        'daily_special_rate': texas_sg_rates['special_pay'],
+        'daily_allowance_rate': texas_sg_rates['daily_allowance'],
+    }
 
+def _texas_sg_month(year, month, days_in_month, texas_sg_rates):
+    """Texas State Guard pay for one month segment; the NG-only pay types stay 0"""
+    return MonthlyPay(
+        year, month, days_in_month,
+        base_pay=round(texas_sg_rates['daily_base_rate'] * days_in_month, 2),
+        special_pay=round(texas_sg_rates['special_pay'] * days_in_month, 2),
+        allowances=round(texas_sg_rates['daily_allowance'] * days_in_month, 2),
+        total=round(texas_sg_rates['total_daily_rate'] * days_in_month, 2),
+    )
+
+def _texas_sg_prorated_month(year, month, parts):
+    """Texas State Guard pay for a month whose pay table changes part way through.
+
+    `parts` is a list of (days, texas_sg_rates) in date order.
+    """
+    return MonthlyPay(
+        year, month, sum(days for days, _ in parts),
+        base_pay=round(sum(rates['daily_base_rate'] * days for days, rates in parts), 2),
+        special_pay=round(sum(rates['special_pay'] * days for days, rates in parts), 2),
+        allowances=round(sum(rates['daily_allowance'] * days for days, rates in parts), 2),
+        total=round(sum(rates['total_daily_rate'] * days for days, rates in parts), 2),
+    )
+
+def _pay_result(texas_sg, months, start_date, end_date, rates, inputs=None):
+    """Total up a list of MonthlyPay records into a PayResult with the given daily rates"""
     total_days = (end_date - start_date).days + 1
-    grand_total = sum(month['total'] for month in monthly_breakdown.values())
+    grand_total = sum(month.total for month in months)
+    return PayResult(texas_sg, months=tuple(months), total_days=total_days, grand_total=round(grand_total, 2),
+                     inputs=inputs, **rates)
+
+def calculate_texas_sg_result(start_date, end_date, rate_table=None):
+    """Calculate Texas State Guard pay with fixed rates as a PayResult"""
+    texas_sg_rates = (rate_table or get_rate_table(start_date)).texas_sg
+    months = [
+        _texas_sg_month(year, month, days, texas_sg_rates)
+        for year, month, days in month_segments(start_date, end_date)
+    ]
+    return _pay_result(True, months, start_date, end_date, _texas_sg_result_rates(texas_sg_rates))
 
-    return {
-        'daily_base_rate': TEXAS_SG_RATES['daily_base_rate'],
-        'daily_special_rate': TEXAS_SG_RATES['special_pay'],
-        'daily_allowance_rate': TEXAS_SG_RATES['daily_allowance'],
-        'monthly_breakdown': monthly_breakdown,
-        'total_days': total_days,
-        'grand_total': round(grand_total, 2)
-    }
+def calculate_texas_sg_pay(start_date, end_date):
+    """Calculate pay for Texas State Guard with fixed rates"""
+    return calculate_pay_result(ServiceCategory.TEXAS_SG, None, 0, start_date, end_date).to_dict()
 
-def calculate_total_pay(service_category, grade, years_of_service, start_date, end_date, has_dependents=False, 
-                       hazardous_duty=False, hardship_duty=False, at_border=False, present_this_month=False):
-    """Calculate total pay based on service category"""
+# Daily rates and monthly incentives that drive every Army/Air NG month
+NgRates = namedtuple('NgRates', [
+    'base', 'bah', 'bas', 'per_diem', 'adjustment', 'hazard_pay', 'hardship_pay', 'danger_pay'
+])
 
-    if service_category == ServiceCategory.TEXAS_SG:
-        return calculate_texas_sg_pay(start_date, end_date)
+def _ng_rates(grade, years_of_service, has_dependents=False, hazardous_duty=False, hardship_duty=False,
+              at_border=False, present_this_month=False, rate_table=None):
+    """Resolve the daily rates and monthly incentives for an Army/Air NG order.
 
-    # For Army NG and Air NG, use existing calculation logic
-    daily_base_rate = get_base_pay_rate(grade, years_of_service)
-    daily_bah_rate, daily_bas_rate = calculate_daily_allowances(grade, has_dependents)
+    Uses today's rate table unless a specific one is given.
+    """
+    METRICS.count('rates.resolve')
+    rate_table = rate_table or get_rate_table()
+    daily_base_rate = rate_table.base_pay_rate(grade, years_of_service)
+    daily_bah_rate = round(rate_table.bah_rate(grade, has_dependents), 2)
+    daily_bas_rate = round(rate_table.bas_rate(grade), 2)
 
     # Calculate minimum income adjustment if needed
-    daily_adjustment = calculate_minimum_income_adjustment(daily_base_rate, daily_bah_rate, daily_bas_rate)
+    daily_adjustment = calculate_minimum_income_adjustment(daily_base_rate, daily_bah_rate, daily_bas_rate,
+                                                           rate_table)
 
-    # Initialize monthly breakdown
-    monthly_breakdown = {}
+    # Monthly incentives (full amount if present any day in the month)
+    hazard_pay = get_hazardous_duty_pay(hazardous_duty, present_this_month)
+    hardship_pay = get_hardship_duty_pay(present_this_month if hardship_duty else False)
+    danger_pay = get_imminent_danger_pay(present_this_month, at_border)
 
-    # Get month range
-    current_date = start_date
-    while current_date <= end_date:
-        month_key = current_date.strftime('%B %Y')
+    return NgRates(daily_base_rate, daily_bah_rate, daily_bas_rate, rate_table.per_diem, daily_adjustment,
+                   hazard_pay, hardship_pay, danger_pay)
 
-        # Calculate days in this month
-        month_start = max(start_date, date(current_date.year, current_date.month, 1))
-        if current_date.month == 12:
-            next_month = date(current_date.year + 1, 1, 1)
-        else:
-            next_month = date(current_date.year, current_date.month + 1, 1)
-        month_end = min(end_date, next_month - pd.Timedelta(days=1))
-        days_in_month = (month_end - month_start).days + 1
-
-        # Calculate pay for this month
-        base_pay = daily_base_rate * days_in_month
-        bah = daily_bah_rate * days_in_month
-        bas = daily_bas_rate * days_in_month
-        per_diem = PER_DIEM_RATE * days_in_month
-
-        # Calculate minimum income adjustment for the month
-        adjustment = daily_adjustment * days_in_month
-
-        # Monthly incentives (full amount if present any day in the month)
-        hazard_pay = get_hazardous_duty_pay(hazardous_duty, present_this_month)
-        hardship_pay = get_hardship_duty_pay(present_this_month if hardship_duty else False)
-        danger_pay = get_imminent_danger_pay(present_this_month, at_border)
-
-        monthly_total = base_pay + bah + bas + per_diem + adjustment + hazard_pay + hardship_pay + danger_pay
-
-        # Store monthly breakdown
-        monthly_breakdown[month_key] = {
-            'days': days_in_month,
-            'base_pay': round(base_pay, 2),
-            'bah': round(bah, 2),
-            'bas': round(bas, 2),
-            'per_diem': round(per_diem, 2),
-            'minimum_income_adjustment': round(adjustment, 2),
-            'hazard_pay': round(hazard_pay, 2),
-            'hardship_pay': round(hardship_pay, 2),
-            'danger_pay': round(danger_pay, 2),
-            'total': round(monthly_total, 2)
-        }
+def _ng_result_rates(rates):
+    """Daily rates reported on an Army/Air NG result"""
+    return {
+        'daily_base_rate': rates.base,
+        'daily_bah_rate': rates.bah,
+        'daily_bas_rate': rates.bas,
+        'daily_per_diem_rate': rates.per_diem,
+        'daily_adjustment_rate': rates.adjustment,
+    }
 
-        # Move to next month
-        if current_date.month == 12:
-            current_date = date(current_date.year + 1, 1, 1)
-        else:
-            current_date = date(current_date.year, current_date.month + 1, 1)
+def _ng_month_record(year, month, days_in_month, base_pay, bah, bas, per_diem, adjustment, hazard_pay,
+                     hardship_pay, danger_pay):
+    """Round one month's Army/Air NG amounts into a MonthlyPay record"""
+    monthly_total = base_pay + bah + bas + per_diem + adjustment + hazard_pay + hardship_pay + danger_pay
+
+    return MonthlyPay(
+        year, month, days_in_month,
+        base_pay=round(base_pay, 2),
+        bah=round(bah, 2),
+        bas=round(bas, 2),
+        per_diem=round(per_diem, 2),
+        minimum_income_adjustment=round(adjustment, 2),
+        hazard_pay=round(hazard_pay, 2),
+        hardship_pay=round(hardship_pay, 2),
+        danger_pay=round(danger_pay, 2),
+        total=round(monthly_total, 2),
+    )
+
+def _ng_month(year, month, days_in_month, rates):
+    """Army/Air NG pay for one month segment at a single set of rates"""
+    return _ng_month_record(
+        year, month, days_in_month,
+        rates.base * days_in_month, rates.bah * days_in_month, rates.bas * days_in_month,
+        rates.per_diem * days_in_month, rates.adjustment * days_in_month, rates.hazard_pay, rates.hardship_pay, rates.danger_pay,
+    )
+
+def _ng_prorated_month(year, month, parts):
+    """Army/Air NG pay for a month whose rates change part way through.
+
+    `parts` is a list of (days, NgRates) in date order. Daily amounts are
+    prorated across the parts; each monthly incentive is paid in full if the
+    member qualifies in any of them.
+    """
+    return _ng_month_record(
+        year, month, sum(days for days, _ in parts),
+        sum(rates.base * days for days, rates in parts),
+        sum(rates.bah * days for days, rates in parts),
+        sum(rates.bas * days for days, rates in parts),
+        sum(rates.per_diem * days for days, rates in parts),
+        sum(rates.adjustment * days for days, rates in parts),
+        max(rates.hazard_pay for _, rates in parts),
+        max(rates.hardship_pay for _, rates in parts),
+        max(rates.danger_pay for _, rates in parts),
+    )
+
+def _calculate_pay_result(service_category, grade, years_of_service, start_date, end_date, has_dependents=False,
+                          hazardous_duty=False, hardship_duty=False, at_border=False, present_this_month=False,
+                          rate_table=None):
+    """Calculate total pay based on service category as a PayResult from one rate table (uncached)"""
+    rate_table = rate_table or get_rate_table(start_date)
 
-    # Calculate overall totals
-    total_days = (end_date - start_date).days + 1
-    grand_total = sum(month['total'] for month in monthly_breakdown.values())
+    if service_category == ServiceCategory.TEXAS_SG:
+        return calculate_texas_sg_result(start_date, end_date, rate_table)
 
-    return {
-        'daily_base_rate': daily_base_rate,
-        'daily_bah_rate': daily_bah_rate,
-        'daily_bas_rate': daily_bas_rate,
-        'daily_per_diem_rate': PER_DIEM_RATE,
-        'daily_adjustment_rate': daily_adjustment,
-        'monthly_breakdown': monthly_breakdown,
-        'total_days': total_days,
-        'grand_total': round(grand_total, 2)
-    }
+    # For Army NG and Air NG, use existing calculation logic
+    rates = _ng_rates(grade, years_of_service, has_dependents, hazardous_duty, hardship_duty, at_border,
+                      present_this_month, rate_table)
+    months = [_ng_month(year, month, days, rates) for year, month, days in month_segments(start_date, end_date)]
+    return _pay_result(False, months, start_date, end_date, _ng_result_rates(rates))
+
+# Normalized, hashable form of the calculate_total_pay arguments
+PayInputs = namedtuple('PayInputs', [
+    'service_category', 'grade', 'years_of_service', 'start_date', 'end_date', 'has_dependents',
+    'hazardous_duty', 'hardship_duty', 'at_border', 'present_this_month'
+])
+
+def _is_blank(value):
+    """True for None, '' and NaN/NaT placeholders left by blank spreadsheet cells"""
+    return value is None or value == '' or value != value
+
+def missing_pay_inputs(service_category, grade, years_of_service, start_date, end_date):
+    """Names of the required pay inputs left blank; Texas SG orders need neither grade nor years"""
+    required = [('start_date', start_date), ('end_date', end_date)]
+    if service_category != ServiceCategory.TEXAS_SG:
+        required = [('grade', grade), ('years_of_service', years_of_service)] + required
+    return [name for name, value in required if _is_blank(value)]
+
+def missing_inputs_message(missing):
+    """Error message for the names returned by missing_pay_inputs"""
+    return f"Missing required pay inputs: {', '.join(missing)}"
+
+def normalize_pay_inputs(service_category, grade, years_of_service, start_date, end_date, has_dependents=False,
+                         hazardous_duty=False, hardship_duty=False, at_border=False, present_this_month=False):
+    """Reduce pay arguments to a PayInputs record holding only what affects the result.
+
+    Texas State Guard pay depends on the dates alone, and years of service only
+    matter down to the pay-table bracket, so inputs that would produce the same
+    result share the same record. Raises ValueError when a required input is blank.
+    """
+    missing = missing_pay_inputs(service_category, grade, years_of_service, start_date, end_date)
+    if missing:
+        raise ValueError(missing_inputs_message(missing))
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    if service_category == ServiceCategory.TEXAS_SG:
+        return PayInputs(ServiceCategory.TEXAS_SG, None, None, start_date, end_date,
+                         False, False, False, False, False)
+    years = min(max(int(years_of_service), 0), get_rate_table(start_date).max_years)
+    return PayInputs(service_category, grade, years, start_date, end_date, bool(has_dependents),
+                     bool(hazardous_duty), bool(hardship_duty), bool(at_border), bool(present_this_month))
+
+# A change to the rates of an order from effective_date on. Fields left as
+# None keep their current value; rate_table switches pay tables.
+RateEvent = namedtuple('RateEvent', ['effective_date', 'grade', 'years_of_service', 'rate_table'],
+                       defaults=(None, None, None))
+
+def promotion_event(effective_date, grade):
+    """Rate event for a promotion to `grade` effective on the given date"""
+    return RateEvent(effective_date, grade=grade)
+
+def _anniversary(pay_entry_date, years):
+    """The date `years` after pay_entry_date; Feb 29 falls on Mar 1 in other years"""
+    try:
+        return pay_entry_date.replace(year=pay_entry_date.year + years)
+    except ValueError:
+        return date(pay_entry_date.year + years, 3, 1)
+
+def years_of_service_events(pay_entry_date, start_date, end_date):
+    """Rate events for every years-of-service step that applies between start_date and end_date.
+
+    The first event sets the years already served on start_date, so the
+    years_of_service passed with the order no longer matters.
+    """
+    pay_entry_date, start_date, end_date = _as_date(pay_entry_date), _as_date(start_date), _as_date(end_date)
+    years = max(start_date.year - pay_entry_date.year, 0)
+    if years and _anniversary(pay_entry_date, years) > start_date:
+        years -= 1
+    events = [RateEvent(start_date, years_of_service=years)]
+    anniversary = _anniversary(pay_entry_date, years + 1)
+    while anniversary <= end_date:
+        years += 1
+        events.append(RateEvent(anniversary, years_of_service=years))
+        anniversary = _anniversary(pay_entry_date, years + 1)
+    return events
+
+def _rate_segments(inputs, events):
+    """Sweep the sorted event breakpoints into (first_day, last_day, rates) segments.
+
+    Rates are NgRates, or the table's Texas SG rates for Texas State Guard
+    orders (which only rate_table events change). Events on or before the
+    start date set the opening rates, events after the end date are ignored,
+    and neighbouring segments with identical rates are merged, so the number
+    of segments is bounded by the number of events.
+    """
+    state = {'grade': inputs.grade, 'years_of_service': inputs.years_of_service,
+             'rate_table': get_rate_table(inputs.start_date)}
+
+    def current_rates():
+        if inputs.service_category == ServiceCategory.TEXAS_SG:
+            return state['rate_table'].texas_sg
+        return _ng_rates(state['grade'], state['years_of_service'], inputs.has_dependents, inputs.hazardous_duty,
+                         inputs.hardship_duty, inputs.at_border, inputs.present_this_month, state['rate_table'])
+
+    segments = []
+
+    def close(first_day, last_day):
+        rates = current_rates()
+        if segments and segments[-1][2] == rates:
+            segments[-1] = (segments[-1][0], last_day, rates)
+        else:
+            segments.append((first_day, last_day, rates))
+
+    segment_start = inputs.start_date
+    for event in sorted(events, key=lambda event: _as_date(event.effective_date)):
+        effective_date = _as_date(event.effective_date)
+        if effective_date > inputs.end_date:
+            break
+        if effective_date > segment_start:
+            close(segment_start, effective_date - timedelta(days=1))
+            segment_start = effective_date
+        for name in ('grade', 'years_of_service', 'rate_table'):
+            value = getattr(event, name)
+            if value is not None:
+                state[name] = value
+    close(segment_start, inputs.end_date)
+    return segments
+
+def _calculate_timeline_result(inputs, events):
+    """Calculate pay with rates that change on the given events, as a PayResult.
+
+    Each month is split only where a segment boundary falls inside it, so the
+    work is proportional to months plus events rather than days. The reported
+    daily rates are the ones in force on the last day of the order.
+    """
+    if inputs.end_date < inputs.start_date:
+        return _calculate_pay_result(*inputs)
+
+    texas_sg = inputs.service_category == ServiceCategory.TEXAS_SG
+    single_month, prorated_month = (_texas_sg_month, _texas_sg_prorated_month) if texas_sg \
+        else (_ng_month, _ng_prorated_month)
+    segments = _rate_segments(inputs, events)
+    months = []
+    index = 0
+    for year, month, days in month_segments(inputs.start_date, inputs.end_date):
+        month_first = max(inputs.start_date, date(year, month, 1))
+        month_last = month_first + timedelta(days=days - 1)
+        parts = []
+        while index < len(segments):
+            first_day, last_day, rates = segments[index]
+            parts.append(((min(last_day, month_last) - max(first_day, month_first)).days + 1, rates))
+            if last_day > month_last:
+                break
+            index += 1
+        if len(parts) == 1:
+            months.append(single_month(year, month, days, parts[0][1]))
+        else:
+            months.append(prorated_month(year, month, parts))
+
+    final_rates = segments[-1][2]
+    rates = _texas_sg_result_rates(final_rates) if texas_sg else _ng_result_rates(final_rates)
+    return _pay_result(texas_sg, months, inputs.start_date, inputs.end_date, rates)
+
+class PayCache:
+    """Thread-safe, size-bounded LRU cache of pay results with hit/miss counters"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached result for key (marking it most recently used) or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        """Store a result, evicting the least recently used entries beyond maxsize"""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return size, limit and hit/miss counters"""
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses}
+
+PAY_CACHE = PayCache()
+METRICS.add_source('pay_cache', PAY_CACHE.stats)
+
+def calculate_pay_result(service_category, grade, years_of_service, start_date, end_date, has_dependents=False,
+                         hazardous_duty=False, hardship_duty=False, at_border=False, present_this_month=False,
+                         events=()):
+    """Calculate pay as a shared, cached PayResult.
+
+    `events` are RateEvents applied from their effective dates; results
+    calculated with them cannot be passed to recalculate_pay_result.
+    """
+    events = tuple(events)
+    inputs = normalize_pay_inputs(service_category, grade, years_of_service, start_date, end_date, has_dependents,
+                                  hazardous_duty, hardship_duty, at_border, present_this_month)
+    if inputs.service_category == ServiceCategory.TEXAS_SG:
+        # Only pay-table changes affect Texas SG, so other events must not split the cache
+        events = tuple(event for event in events if event.rate_table is not None)
+    tables = order_rate_tables(inputs.start_date, inputs.end_date)
+    key = (inputs, tables, events)
+    result = PAY_CACHE.get(key)
+    if result is not None:
+        return result
+
+    if events:
+        if not any(event.rate_table is not None for event in events):
+            events = tuple(rate_table_events(inputs.start_date, inputs.end_date)) + events
+        with METRICS.timer('pay.calculate_timeline'):
+            result = _calculate_timeline_result(inputs, events)
+    elif len(tables) > 1:
+        # The order crosses a pay-table change; its inputs still describe it fully
+        with METRICS.timer('pay.calculate_timeline'):
+            timeline = _calculate_timeline_result(inputs, rate_table_events(inputs.start_date, inputs.end_date))
+        result = replace(timeline, inputs=inputs)
+    else:
+        with METRICS.timer('pay.calculate'):
+            result = replace(_calculate_pay_result(*inputs, rate_table=tables[0]), inputs=inputs)
+    PAY_CACHE.put(key, result)
+    return result
+
+def calculate_total_pay(service_category, grade, years_of_service, start_date, end_date, has_dependents=False,
+                        hazardous_duty=False, hardship_duty=False, at_border=False, present_this_month=False,
+                        events=()):
+    """Calculate total pay based on service category"""
+    return calculate_pay_result(service_category, grade, years_of_service, start_date, end_date, has_dependents,
+                                hazardous_duty, hardship_duty, at_border, present_this_month, events).to_dict()
+
+def _month_rates(inputs, rate_table):
+    """NgRates for Army/Air NG inputs, or None for Texas SG (fixed rates)"""
+    if inputs.service_category == ServiceCategory.TEXAS_SG:
+        return None
+    return _ng_rates(inputs.grade, inputs.years_of_service, inputs.has_dependents, inputs.hazardous_duty,
+                     inputs.hardship_duty, inputs.at_border, inputs.present_this_month, rate_table)
+
+@METRICS.timed('pay.recalculate')
+def recalculate_pay_result(previous, effective_date=None, **changes):
+    """Recalculate a PayResult after some of its inputs change, rebuilding only the affected months.
+
+    `changes` uses calculate_total_pay argument names; with `effective_date`
+    rate changes apply from that date only, and the result cannot be
+    recalculated again. `previous` must record its inputs.
+    """
+    if previous.inputs is None:
+        raise ValueError("Pay result does not record its inputs (it was calculated with events or an "
+                         "effective_date); calculate it with calculate_pay_result")
+    unknown = set(changes) - set(PayInputs._fields)
+    if unknown:
+        raise TypeError(f"Unknown pay inputs: {', '.join(sorted(unknown))}")
+
+    old_inputs = previous.inputs
+    if changes.get('service_category', old_inputs.service_category) != old_inputs.service_category:
+        return calculate_pay_result(*old_inputs._replace(**changes))
+    inputs = normalize_pay_inputs(*old_inputs._replace(**changes))
+    if inputs == old_inputs:
+        return previous
+
+    tables = order_rate_tables(inputs.start_date, inputs.end_date)
+    if len(tables) > 1 or order_rate_tables(old_inputs.start_date, old_inputs.end_date) != tables:
+        if effective_date is not None:
+            raise ValueError("effective_date is not supported for orders that cross a pay-table change; "
+                             "pass the change as events to calculate_pay_result")
+        return calculate_pay_result(*inputs)
+    rate_table = tables[0]
+
+    texas_sg = inputs.service_category == ServiceCategory.TEXAS_SG
+    old_rates = _month_rates(old_inputs, rate_table)
+    new_rates = _month_rates(inputs, rate_table)
+    rates_changed = old_rates != new_rates
+
+    effective_period = None
+    if rates_changed and effective_date is not None:
+        effective_date = _as_date(effective_date)
+        effective_period = effective_date.year * 12 + effective_date.month - 1
+
+    # Months are contiguous, so a previous month is found by its offset from the first one
+    previous_months = previous.months
+    first_period = previous_months[0].period if previous_months else 0
+
+    months = []
+    for year, month, days in month_segments(inputs.start_date, inputs.end_date):
+        period = year * 12 + month - 1
+
+        if rates_changed and (effective_period is None or period >= effective_period):
+            if effective_period == period:
+                # Days of this segment that fall before the effective date keep the old rates
+                segment_start = max(inputs.start_date, date(year, month, 1))
+                days_before = min(max((effective_date - segment_start).days, 0), days)
+                parts = [(days_before, old_rates), (days - days_before, new_rates)]
+                months.append(_ng_prorated_month(year, month, [part for part in parts if part[0]]))
+            else:
+                months.append(_ng_month(year, month, days, new_rates))
+            continue
+
+        index = period - first_period
+        if 0 <= index < len(previous_months) and previous_months[index].days == days:
+            months.append(previous_months[index])
+        elif texas_sg:
+            months.append(_texas_sg_month(year, month, days, rate_table.texas_sg))
+        else:
+            months.append(_ng_month(year, month, days, old_rates))
+
+    rates = _texas_sg_result_rates(rate_table.texas_sg) if texas_sg else _ng_result_rates(new_rates)
+    if effective_period is not None:
+        return _pay_result(texas_sg, months, inputs.start_date, inputs.end_date, rates)
+    # Same result a full calculation would give, so later lookups can share it
+    result = _pay_result(texas_sg, months, inputs.start_date, inputs.end_date, rates, inputs)
+    PAY_CACHE.put((inputs, tables, ()), result)
+    return result
+
+def clear_pay_cache():
+    """Invalidate all cached pay results"""
+    PAY_CACHE.clear()
 
 def format_currency(amount):
     """Format number as currency"""